@@ -0,0 +1,26 @@
+from .create_db import create_database_from_pdf, query_database
+from .document_rag import DocumentRAG
+from .embeddings import HashingEmbeddings
+from .ingest import EmbeddingPipeline
+from .layout_chunker import chunk_page, chunk_boxes
+from .retriever import Retriever, reciprocal_rank_fusion, lexical_cross_score
+from .bm25_index import BM25Index
+from .semantic_cache import SemanticCache
+from .vector_index import BruteForceIndex, GraphIndex
+
+__all__ = [
+    "create_database_from_pdf",
+    "query_database",
+    "DocumentRAG",
+    "HashingEmbeddings",
+    "EmbeddingPipeline",
+    "chunk_page",
+    "chunk_boxes",
+    "Retriever",
+    "reciprocal_rank_fusion",
+    "lexical_cross_score",
+    "BM25Index",
+    "SemanticCache",
+    "BruteForceIndex",
+    "GraphIndex"
+]
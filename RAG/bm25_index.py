@@ -0,0 +1,86 @@
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# Keeps identifiers such as "XK-2041b", "3.2", "os.path.join" or "max_chars" whole
+_TOKEN = re.compile(r"\w(?:[\w.\-/:]*\w)?")
+_PART = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """Lowercased terms. Compound tokens are indexed whole and also as their parts."""
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over chunk texts, for the exact terms embeddings tend to blur together."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.doc_lengths = []
+        self.postings = {}
+        self.average_length = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, ids, texts):
+        self.ids = list(ids)
+        postings = defaultdict(list)
+        self.doc_lengths = []
+        for doc, text in enumerate(texts):
+            terms = tokenize(text)
+            self.doc_lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                postings[term].append((doc, count))
+        self.postings = dict(postings)
+        self.average_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        return self
+
+    def search(self, query, k):
+        n = len(self.ids)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc] / self.average_length)
+                scores[doc] += idf * count * (self.k1 + 1) / (count + norm)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.ids[doc], score) for doc, score in top]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        with gzip.open(os.path.join(path, "bm25.json.gz"), "wt", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self.ids,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(os.path.join(path, "bm25.json.gz"), "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["k1"], data["b"])
+        index.ids = data["ids"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {term: [tuple(posting) for posting in postings] for term, postings in data["postings"].items()}
+        index.average_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
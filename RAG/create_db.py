@@ -1,84 +1,270 @@
+import fitz
 import google.generativeai as genai
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_community.vectorstores import Chroma
+import hashlib
 import os
-import shutil
 import json
+import time
 
-def create_database_from_pdf(file_path, chroma_path="chroma"):
-    # Load config and set up API key
-    with open("../llm.json", "r") as f:
-        llm_config = json.load(f)
+from fileai.render_cache import fitz_lock
+from fileai.text_index import extract_page, file_hash
+from customAgents.agent_llm.cancellation import is_cancelled, until_cancelled
+from RAG.ingest import EmbeddingPipeline
+from RAG.layout_chunker import CHUNKER_VERSION, chunk_page
+from RAG.retriever import get_retriever
+from RAG.semantic_cache import SemanticCache
 
-    GOOGLE_API_KEY = llm_config["api_key"]
-    genai.configure(api_key=GOOGLE_API_KEY)
+LLM_CONFIG_PATH = "llm.json"
+MANIFEST_NAME = "manifest.json"
 
-    loader = PyPDFLoader(file_path)
-    documents = loader.load()
-    print(f"Loaded {len(documents)} documents from {file_path}.")
 
-    # Split files into chunks using a better approach
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-        add_start_index=True,
-    )
-    chunks = text_splitter.split_documents(documents)
-    print(f"Split {len(documents)} documents into {len(chunks)} chunks.")
+def load_api_key(config_path=LLM_CONFIG_PATH):
+    with open(config_path, "r") as f:
+        llm_config = json.load(f)
+    return llm_config["api_key"]
 
-    # Clear out the database first
-    if os.path.exists(chroma_path):
-        shutil.rmtree(chroma_path)
 
-    embedding_model = GoogleGenerativeAIEmbeddings(
+def make_embedding_model(api_key):
+    genai.configure(api_key=api_key)
+    return GoogleGenerativeAIEmbeddings(
         model="models/embedding-001",
-        google_api_key=GOOGLE_API_KEY,
+        google_api_key=api_key,
+    )
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_pages(file_path, document_index=None):
+    """
+    Yields (page_number, entry) for every page. The entries of an open DocumentIndex are
+    reused, otherwise the file is opened with fitz and extracted the same way.
+    """
+    if document_index is not None:
+        document_index.ready.wait()
+        for page_number in range(len(document_index.pages)):
+            yield page_number, document_index.page(page_number)
+        return
+    with fitz_lock:
+        doc = fitz.open(file_path)
+    try:
+        for page_number in range(doc.page_count):
+            with fitz_lock:
+                entry = extract_page(doc.load_page(page_number))
+            yield page_number, entry
+    finally:
+        with fitz_lock:
+            doc.close()
+
+
+def load_manifest(chroma_path):
+    manifest_path = os.path.join(chroma_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(chroma_path, manifest):
+    manifest_path = os.path.join(chroma_path, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def store_version(manifest):
+    """Identifies the store contents, for caches derived from it such as the local vector index."""
+    if not manifest.get("file_hash"):
+        return None
+    return f"{manifest['file_hash']}-{manifest.get('chunker', 0)}"
+
+
+def upsert_chunks(db, chunks, embedding_model, pipeline=None, cancel_token=None):
+    """
+    Writes (chunk_id, Document) pairs to the store. Vectors already stored for the same
+    chunk text are copied instead of embedded again, the rest go through an EmbeddingPipeline,
+    which stops taking new chunks once cancel_token is cancelled.
+    Returns the number of chunks embedded.
+    """
+    if not chunks:
+        return 0
+    needed = {chunk.metadata["content_hash"] for _, chunk in chunks}
+    stored = db.get(include=["metadatas"])
+    reuse_ids = {}
+    for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+        content_hash = (metadata or {}).get("content_hash")
+        if content_hash in needed:
+            reuse_ids.setdefault(content_hash, chunk_id)
+    reused = {}
+    if reuse_ids:
+        found = db.get(ids=list(reuse_ids.values()), include=["embeddings", "metadatas"])
+        for metadata, embedding in zip(found["metadatas"], found["embeddings"]):
+            reused[metadata["content_hash"]] = list(embedding)
+
+    def write(ids, embeddings, documents, metadatas):
+        db._collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    copied = [(chunk_id, chunk) for chunk_id, chunk in chunks if chunk.metadata["content_hash"] in reused]
+    if copied:
+        write(
+            [chunk_id for chunk_id, _ in copied],
+            [reused[chunk.metadata["content_hash"]] for _, chunk in copied],
+            [chunk.page_content for _, chunk in copied],
+            [chunk.metadata for _, chunk in copied],
+        )
+
+    if pipeline is None:
+        pipeline = EmbeddingPipeline(embedding_model)
+    stats = pipeline.run(
+        until_cancelled((
+            (chunk_id, chunk.page_content, chunk.metadata)
+            for chunk_id, chunk in chunks if chunk.metadata["content_hash"] not in reused
+        ), cancel_token),
+        write,
     )
+    if stats["chunks"]:
+        print(f"Embedded {stats['chunks']} chunks in {stats['seconds']}s ({stats['chunks_per_second']} chunks/s, {stats['retries']} retries).")
+    return stats["chunks"]
+
 
-    # Create a new DB from the documents
+def create_database_from_pdf(file_path, chroma_path="chroma", embedding_model=None, pipeline=None, document_index=None,
+                             cancel_token=None):
+    """
+    Brings the Chroma store at chroma_path up to date with the PDF. The manifest records the
+    file hash and a hash per page, only pages whose layout changed are chunked again and only
+    chunks not already in the store are embedded, chunks of removed or changed pages are deleted.
+    Pages are chunked by layout_chunker from the blocks of document_index when one is given.
+    A build cancelled through cancel_token returns None and leaves the manifest as it was, the
+    chunks it already wrote are reused by the next build.
+    """
+    if embedding_model is None:
+        embedding_model = make_embedding_model(load_api_key())
+
+    start = time.perf_counter()
+    os.makedirs(chroma_path, exist_ok=True)
+    manifest = load_manifest(chroma_path)
     db = Chroma(
         persist_directory=chroma_path,
         embedding_function=embedding_model
     )
-    db.add_documents(chunks)
-    db.persist()
-    print(f"Saved {len(chunks)} chunks to {chroma_path}.")
+    content_hash = file_hash(file_path)
+    if manifest.get("file_hash") == content_hash and manifest.get("chunker") == CHUNKER_VERSION:
+        print(f"{chroma_path} is up to date with {file_path}.")
+        return db
 
+    old_pages = manifest.get("pages", {}) if manifest.get("chunker") == CHUNKER_VERSION else {}
+    existing = set(db.get(include=[])["ids"])
+    pages = {}
+    new_chunks = []
+    section = ""
+    for page_number, entry in load_pages(file_path, document_index):
+        if is_cancelled(cancel_token):
+            return None
+        # The section carried in from the previous page is part of what a page's chunks contain
+        page_hash = text_hash(json.dumps([section, entry["blocks"]]))
+        chunks, section = chunk_page(page_number, entry, section)
+        page_number = str(page_number)
+        old_page = old_pages.get(page_number)
+        if old_page and old_page["hash"] == page_hash and existing.issuperset(old_page["chunks"]):
+            pages[page_number] = old_page
+            continue
+        chunk_ids = []
+        for chunk in chunks:
+            chunk.metadata["content_hash"] = text_hash(chunk.page_content)
+            chunk_id = text_hash(f"{page_number}:{chunk.metadata['block']}:{chunk.page_content}")
+            chunk_ids.append(chunk_id)
+            new_chunks.append((chunk_id, chunk))
+        pages[page_number] = {"hash": page_hash, "chunks": chunk_ids}
 
-def query_database(api_key: str, chroma_path: str, question: str):
-    
-    genai.configure(api_key=api_key)
-    
-    embedding_model = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=api_key,
+    wanted = {chunk_id for page in pages.values() for chunk_id in page["chunks"]}
+    embedded = upsert_chunks(
+        db, [(chunk_id, chunk) for chunk_id, chunk in new_chunks if chunk_id not in existing], embedding_model, pipeline,
+        cancel_token
     )
+    if is_cancelled(cancel_token):
+        db.persist()
+        return None
+    stale = list(existing - wanted)
+    if stale:
+        db.delete(ids=stale)
+    db.persist()
 
-    vectordb = Chroma(
-        persist_directory=chroma_path,
-        embedding_function=embedding_model
-    )
+    build_seconds = time.perf_counter() - start
+    save_manifest(chroma_path, {
+        "file": os.path.basename(file_path),
+        "file_hash": content_hash,
+        "chunker": CHUNKER_VERSION,
+        "pages": pages,
+        "chunks": len(wanted),
+        "embedded": embedded,
+        "removed": len(stale),
+        "build_seconds": round(build_seconds, 3),
+    })
+    print(f"Indexed {len(wanted)} chunks into {chroma_path}: {embedded} embedded, {len(stale)} removed.")
+    return db
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-pro",
-        google_api_key=api_key,
-        temperature=0.7,
-        convert_system_message_to_human=True
+
+_embedding_models = {}
+_chat_models = {}
+semantic_cache = SemanticCache()
+
+
+def get_embedding_model(api_key):
+    if api_key not in _embedding_models:
+        _embedding_models[api_key] = make_embedding_model(api_key)
+    return _embedding_models[api_key]
+
+
+def get_chat_model(api_key):
+    if api_key not in _chat_models:
+        _chat_models[api_key] = ChatGoogleGenerativeAI(
+            model="gemini-pro",
+            google_api_key=api_key,
+            temperature=0.7,
+            convert_system_message_to_human=True
+        )
+    return _chat_models[api_key]
+
+
+def query_database(api_key: str, chroma_path: str, question: str, index_type: str = "auto"):
+    """
+    Answers question from the store at chroma_path. The embedding client, the local vector
+    index and the chat model are created on the first call and reused by later ones, and a
+    question close enough to one already answered for this store is served from semantic_cache.
+    """
+    start = time.perf_counter()
+    embedding_model = get_embedding_model(api_key)
+    version = store_version(load_manifest(chroma_path))
+    question_vector = embedding_model.embed_query(question)
+    document = os.path.abspath(chroma_path)
+    cached = semantic_cache.lookup(document, version, question_vector)
+    if cached is not None:
+        return f"You: {question}\nChatbot: {cached}"
+
+    retriever = get_retriever(
+        chroma_path,
+        version,
+        lambda: Chroma(persist_directory=chroma_path, embedding_function=embedding_model),
+        embedding_model,
+        index_type,
     )
+    llm = get_chat_model(api_key)
 
-    docs = vectordb.similarity_search(question, k=3)
+    docs = retriever.search(question, k=3, query_vector=question_vector)
     context = "\n".join([doc.page_content for doc in docs])
-    
+
     prompt = f"""Based on the following context, please answer the question.
     Context: {context}
-    
+
     Question: {question}
     """
-    
+
     response = llm.invoke(prompt)
+    semantic_cache.store(document, version, question, question_vector, response.content, time.perf_counter() - start)
     answer = f"You: {question}\nChatbot: {response.content}"
     return answer
-
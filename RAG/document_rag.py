@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+import time
+
+from RAG.create_db import create_database_from_pdf, load_api_key, load_manifest, make_embedding_model, store_version
+from RAG.retriever import Retriever
+
+RAG_DIR = os.path.join("cache", "rag")
+
+
+class DocumentRAG:
+    """Retrieval index over one PDF, built in the background and kept across sessions.
+
+    The Chroma store lives under RAG_DIR/<sha256 of the file's absolute path> and is
+    updated incrementally by create_database_from_pdf: reopening an unchanged file is
+    a hash check, an edited file only re-embeds the chunks of the pages that changed.
+    Questions are answered from a Retriever, an in-process vector index over the store.
+    Pages are chunked from the viewer's DocumentIndex when given, so the file is parsed once.
+    cancel stops the build of a document that is no longer open, it then never becomes ready.
+    """
+
+    def __init__(self, pdf_path, embedding_model=None, rag_dir=RAG_DIR, index_type="auto", document_index=None):
+        self.pdf_path = pdf_path
+        self.document_index = document_index
+        self.embedding_model = embedding_model
+        self.rag_dir = rag_dir
+        self.store_key = hashlib.sha256(os.path.abspath(pdf_path).encode("utf-8")).hexdigest()
+        self.index_type = index_type
+        self.db = None
+        self.retriever = None
+        self.manifest = {}
+        self.last_retrieval_seconds = 0.0
+        self.last_results = []
+        self.ready = threading.Event()
+        # Set when the build failed, ready then never gets set
+        self.error = None
+        self.cancelled = threading.Event()
+
+    @property
+    def chroma_path(self):
+        return os.path.join(self.rag_dir, self.store_key)
+
+    @property
+    def cache_key(self):
+        # Same document key query_database uses for the semantic cache
+        return os.path.abspath(self.chroma_path)
+
+    @property
+    def version(self):
+        return store_version(self.manifest)
+
+    def start(self):
+        threading.Thread(target=self._build, daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _build(self):
+        try:
+            if self.embedding_model is None:
+                self.embedding_model = make_embedding_model(load_api_key())
+            self.db = create_database_from_pdf(
+                self.pdf_path, self.chroma_path, self.embedding_model, document_index=self.document_index,
+                cancel_token=self.cancelled
+            )
+            if self.db is None:
+                return
+            self.manifest = load_manifest(self.chroma_path)
+            self.retriever = Retriever(self.chroma_path, self.embedding_model, self.index_type)
+            self.retriever.load(self.db, store_version(self.manifest))
+            self.ready.set()
+        except Exception as e:
+            self.error = e
+            print("RAG indexing error:", e)
+
+    def embed_question(self, question):
+        if not self.ready.is_set():
+            return None
+        return self.embedding_model.embed_query(question)
+
+    def retrieve(self, question, k=4, query_vector=None):
+        """query_vector is the question's embedding from embed_question, when the caller already has it."""
+        if not self.ready.is_set():
+            return []
+        start = time.perf_counter()
+        docs = self.retriever.search(question, k=k, query_vector=query_vector)
+        self.last_retrieval_seconds = time.perf_counter() - start
+        self.last_results = docs
+        return docs
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m RAG.document_rag file.pdf
+    # Uses the deterministic HashingEmbeddings so no API key or network is needed.
+    import sys
+    import tempfile
+    from RAG.embeddings import HashingEmbeddings
+
+    rag = DocumentRAG(sys.argv[1], embedding_model=HashingEmbeddings(), rag_dir=tempfile.mkdtemp())
+    rag._build()
+    chunks, build_seconds = rag.manifest["chunks"], rag.manifest["build_seconds"]
+    print(f"indexed {chunks} chunks in {build_seconds}s ({chunks / max(build_seconds, 1e-9):.1f} chunks/s)")
+    start = time.perf_counter()
+    create_database_from_pdf(rag.pdf_path, rag.chroma_path, rag.embedding_model)
+    print(f"re-index of the unchanged file: {(time.perf_counter() - start) * 1000:.1f} ms")
+    questions = ["introduction", "main result of the paper", "how is the method evaluated", "conclusion and future work"]
+    timings = []
+    for _ in range(25):
+        for question in questions:
+            rag.retrieve(question)
+            timings.append(rag.last_retrieval_seconds)
+    timings.sort()
+    print(f"retrieval: median {timings[len(timings) // 2] * 1000:.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms over {len(timings)} queries")
@@ -0,0 +1,30 @@
+import hashlib
+import math
+import re
+
+from langchain_core.embeddings import Embeddings
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic offline embedding stand-in: a signed hashed bag of words, L2-normalized.
+
+    Retrieval quality is only lexical, it exists so indexing and retrieval can be
+    exercised and benchmarked without network access or API keys.
+    """
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"\w+", text.lower()):
+            h = int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:8], "little")
+            vector[h % self.dimensions] += -1.0 if h >> 63 else 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
@@ -0,0 +1,116 @@
+"""Offline retrieval evaluation: recall@k and search latency of every retriever mode.
+
+    python -m RAG.evaluate [fixture.pdf] [--queries N]
+
+Without a PDF a synthetic technical fixture is generated. Queries are derived from the
+indexed chunks themselves, each with the chunk it came from as the expected answer:
+"exact" queries are an identifier found in only that chunk (part numbers, equation labels,
+API names), "phrase" queries are a short run of words from it. Embeddings come from
+HashingEmbeddings, so the run needs no network or API key.
+"""
+import argparse
+import random
+import re
+import statistics
+import tempfile
+
+import fitz
+
+from RAG.create_db import create_database_from_pdf, load_manifest, store_version
+from RAG.embeddings import HashingEmbeddings
+from RAG.retriever import SEARCH_MODES, Retriever, lexical_cross_score
+
+_WORDS = (
+    "the controller reads each sensor value and writes the filtered result to the output buffer "
+    "when calibration completes the device stores offsets in persistent memory for the next boot "
+    "a watchdog resets the board if the main loop stalls longer than the configured timeout "
+    "power management lowers the clock speed whenever the queue of pending requests is empty"
+).split()
+_IDENTIFIER = re.compile(r"\w*[\d_]\w*(?:[.\-]\w+)*")
+
+
+def make_fixture_pdf(path, pages=30, seed=0):
+    """Writes a PDF of numbered sections mixing prose with part numbers, equation labels and API names."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        y = 72
+        page.insert_text((72, y), f"{page_number + 1}. Module {page_number + 1} reference", fontsize=14)
+        y += 30
+        for paragraph in range(4):
+            words = [rng.choice(_WORDS) for _ in range(45)]
+            words.insert(rng.randrange(len(words)), f"XK-{rng.randrange(1000, 9999)}{rng.choice('abcd')}")
+            words.insert(rng.randrange(len(words)), f"({page_number + 1}.{paragraph + 1})")
+            words.insert(rng.randrange(len(words)), f"set_{rng.choice(_WORDS)}_{rng.randrange(100)}()")
+            text = " ".join(words).capitalize() + "."
+            rect = fitz.Rect(72, y, page.rect.width - 72, y + 140)
+            page.insert_textbox(rect, text, fontsize=10)
+            y += 150
+    doc.save(path)
+    doc.close()
+
+
+def make_queries(retriever, count, seed=0):
+    rng = random.Random(seed)
+    texts = [text for text, _ in retriever.chunks.values()]
+    queries = []
+    for text in rng.sample(texts, min(count, len(texts))):
+        identifiers = [
+            token for token in _IDENTIFIER.findall(text)
+            if len(token) > 2 and sum(token in other for other in texts) == 1
+        ]
+        if identifiers:
+            queries.append(("exact", rng.choice(identifiers), text))
+        words = text.split()
+        if len(words) >= 8:
+            start = rng.randrange(len(words) - 6)
+            queries.append(("phrase", " ".join(words[start:start + 6]), text))
+    return queries
+
+
+def evaluate(retriever, queries, k_values=(1, 5, 10)):
+    """Returns {(mode, kind): {"recall@k": ..., "median_ms": ..., "p95_ms": ...}}."""
+    results = {}
+    configurations = [(mode, None) for mode in SEARCH_MODES] + [("hybrid", lexical_cross_score)]
+    for mode, rerank in configurations:
+        retriever.rerank = rerank
+        name = f"{mode}+rerank" if rerank else mode
+        for kind in sorted({kind for kind, _, _ in queries}):
+            found, timings = {k: 0 for k in k_values}, []
+            subset = [(question, target) for query_kind, question, target in queries if query_kind == kind]
+            for question, target in subset:
+                texts = [doc.page_content for doc in retriever.search(question, k=max(k_values), mode=mode)]
+                timings.append(retriever.last_search_seconds)
+                for k in k_values:
+                    found[k] += target in texts[:k]
+            timings.sort()
+            row = {f"recall@{k}": found[k] / len(subset) for k in k_values}
+            row["median_ms"] = statistics.median(timings) * 1000
+            row["p95_ms"] = timings[int(len(timings) * 0.95)] * 1000
+            results[(name, kind)] = row
+    retriever.rerank = None
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdf", nargs="?")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    pdf_path = args.pdf
+    if pdf_path is None:
+        pdf_path = f"{workdir}/fixture.pdf"
+        make_fixture_pdf(pdf_path)
+    embedding_model = HashingEmbeddings()
+    chroma_path = f"{workdir}/chroma"
+    db = create_database_from_pdf(pdf_path, chroma_path, embedding_model)
+    retriever = Retriever(chroma_path, embedding_model).load(db, store_version(load_manifest(chroma_path)))
+    queries = make_queries(retriever, args.queries)
+    print(f"{len(retriever.chunks)} chunks, {len(queries)} queries")
+    for (name, kind), row in evaluate(retriever, queries).items():
+        print(f"{name:<15} {kind:<7} " + "  ".join(
+            f"{key} {value:.3f}" if key.startswith("recall") else f"{key} {value:.2f}" for key, value in row.items()
+        ))
@@ -0,0 +1,93 @@
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class EmbeddingPipeline:
+    """Embeds a stream of chunks in fixed-size batches with bounded concurrency.
+
+    Chunks are pulled lazily from any iterable of (chunk_id, text, metadata), grouped
+    into batch_size embedding requests, and at most max_concurrency requests are in
+    flight at once. A failed request is retried with exponential backoff and jitter,
+    which is what rate-limited embedding APIs expect. Finished vectors are buffered and
+    handed to write(ids, embeddings, documents, metadatas) in bulk, always from the
+    calling thread so the vector store never sees concurrent writes.
+    """
+
+    def __init__(self, embedding_model, batch_size=64, max_concurrency=4, max_retries=5,
+                 base_delay=1.0, write_batch_size=512, progress=None):
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.write_batch_size = write_batch_size
+        self.progress = progress
+        # Retries of the last run, each run counts its own
+        self.retries = 0
+
+    def run(self, chunks, write):
+        start = time.perf_counter()
+        done = 0
+        retries = 0
+        buffer = []
+        in_flight = set()
+
+        def collect(finished):
+            nonlocal done, retries
+            for future in finished:
+                batch, vectors, batch_retries = future.result()
+                retries += batch_retries
+                buffer.extend((chunk_id, vector, text, metadata) for (chunk_id, text, metadata), vector in zip(batch, vectors))
+                done += len(batch)
+            if self.progress is not None:
+                elapsed = time.perf_counter() - start
+                self.progress(done, done / elapsed if elapsed else 0.0)
+            if len(buffer) >= self.write_batch_size:
+                self._flush(buffer, write)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for batch in self._batches(chunks):
+                if len(in_flight) >= self.max_concurrency:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                in_flight.add(executor.submit(self._embed_batch, batch))
+            collect(in_flight)
+        self._flush(buffer, write)
+        self.retries = retries
+
+        seconds = time.perf_counter() - start
+        return {
+            "chunks": done,
+            "seconds": round(seconds, 3),
+            "chunks_per_second": round(done / seconds, 1) if seconds else 0.0,
+            "retries": retries,
+        }
+
+    def _batches(self, chunks):
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _embed_batch(self, batch):
+        texts = [text for _, text, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                # attempt is the number of retries this batch needed
+                return batch, self.embedding_model.embed_documents(texts), attempt
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.base_delay * (2 ** attempt) * (0.5 + random.random()))
+
+    def _flush(self, buffer, write):
+        if not buffer:
+            return
+        ids, embeddings, documents, metadatas = (list(column) for column in zip(*buffer))
+        write(ids, embeddings, documents, metadatas)
+        buffer.clear()
@@ -0,0 +1,86 @@
+import json
+import re
+
+from langchain_core.documents import Document
+
+CHUNKER_VERSION = 1
+MAX_HEADING_CHARS = 80
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*|[IVXLC]+)[.)]?\s+\S")
+
+
+def is_heading(text):
+    """A one-line block that is short, does not end like a sentence and starts like a title."""
+    if "\n" in text or not 0 < len(text) <= MAX_HEADING_CHARS:
+        return False
+    if text[-1] in ".,;:" or len(text.split()) > 12 or any(c in text for c in "{}[]=<>;"):
+        return False
+    return text[0].isupper() or bool(_NUMBERED_HEADING.match(text))
+
+
+def _pieces(text, max_chars):
+    # Blocks longer than max_chars are cut at line boundaries, never inside a line
+    piece = []
+    size = 0
+    for line in text.split("\n"):
+        if piece and size + len(line) > max_chars:
+            yield "\n".join(piece)
+            piece, size = [], 0
+        piece.append(line)
+        size += len(line) + 1
+    if piece:
+        yield "\n".join(piece)
+
+
+def chunk_page(page_number, entry, section="", max_chars=1000):
+    """
+    Groups the text blocks of one DocumentIndex page entry into chunks. A heading starts a
+    new chunk and becomes the section of the chunks after it, blocks are merged in reading
+    order until max_chars and never split mid-line. Returns (chunks, section at the end of
+    the page) so the caller can carry the section over to the next page.
+    """
+    chunks = []
+    texts, boxes, first_block = [], [], 0
+    heading_only = False
+
+    def flush():
+        if texts:
+            body = "\n".join(texts)
+            chunks.append(Document(
+                page_content=f"{section}\n{body}" if section and not body.startswith(section) else body,
+                metadata={
+                    "page": page_number,
+                    "section": section,
+                    "block": first_block,
+                    "bboxes": json.dumps(boxes),
+                },
+            ))
+        texts.clear()
+        boxes.clear()
+
+    for block_number, (x0, y0, x1, y1, text, block_type) in enumerate(entry["blocks"]):
+        text = text.strip()
+        if block_type != 0 or not text:
+            continue
+        if is_heading(text):
+            if heading_only:
+                # A heading followed directly by another one is not a chunk of its own
+                texts.clear()
+                boxes.clear()
+            flush()
+            section = text
+        for piece in _pieces(text, max_chars):
+            if texts and sum(map(len, texts)) + len(piece) > max_chars:
+                flush()
+            if not texts:
+                first_block = block_number
+            texts.append(piece)
+            heading_only = piece == section
+            if [x0, y0, x1, y1] not in boxes:
+                boxes.append([x0, y0, x1, y1])
+    flush()
+    return chunks, section
+
+
+def chunk_boxes(document):
+    """The (x0, y0, x1, y1) page boxes in points of a chunk made by chunk_page."""
+    return [tuple(box) for box in json.loads(document.metadata.get("bboxes", "[]"))]
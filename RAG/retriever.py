@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from langchain_core.documents import Document
+
+from RAG.bm25_index import BM25Index, tokenize
+from RAG.vector_index import INDEX_TYPES
+
+INDEX_DIR_NAME = "local_index"
+SEARCH_MODES = ("vector", "bm25", "hybrid")
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merges ranked id lists, each id scoring 1 / (k + rank) in every list it appears in."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def lexical_cross_score(question, texts):
+    """
+    Cheap cross-scoring of (question, text) pairs: the share of question terms found in the
+    text, plus one if the text contains the whole question. Any callable with the same
+    signature, such as a cross-encoder, can be passed to Retriever as rerank instead.
+    """
+    terms = set(tokenize(question))
+    phrase = question.lower().strip()
+    scores = []
+    for text in texts:
+        lowered = text.lower()
+        coverage = len(terms & set(tokenize(lowered))) / len(terms) if terms else 0.0
+        scores.append(coverage + (1.0 if phrase and phrase in lowered else 0.0))
+    return scores
+
+
+class Retriever:
+    """Long-lived hybrid retriever over a Chroma store: an in-process vector index plus BM25.
+
+    The vectors, texts and metadata are read out of Chroma once, both indexes are built in
+    that one pass and written together to <chroma_path>/local_index tagged with the store
+    version; later sessions load that copy directly. index_type is "brute", "graph", or
+    "auto", which is brute force unless graph_threshold is set and the store has at least
+    that many chunks, so with the default graph_threshold=None "auto" never builds a graph.
+    The graph index is opt-in because its build runs in Python, see GraphIndex for its cost,
+    while brute force stays around 70ms per query at 1M vectors.
+    mode is "vector", "bm25" or "hybrid", which fuses both rankings by reciprocal rank.
+    rerank, if given, cross-scores the top candidates as rerank(question, texts).
+    """
+
+    def __init__(self, chroma_path, embedding_model, index_type="auto", graph_threshold=None,
+                 mode="hybrid", rerank=None, candidates=20):
+        self.chroma_path = chroma_path
+        self.embedding_model = embedding_model
+        self.index_type = index_type
+        self.graph_threshold = graph_threshold
+        self.mode = mode
+        self.rerank = rerank
+        self.candidates = candidates
+        self.index = None
+        self.bm25 = None
+        self.chunks = {}
+        self.last_search_seconds = 0.0
+
+    @property
+    def index_dir(self):
+        return os.path.join(self.chroma_path, INDEX_DIR_NAME)
+
+    def load(self, db, version):
+        """Loads the saved index if it matches version, otherwise rebuilds it from db."""
+        meta_path = os.path.join(self.index_dir, "meta.json")
+        if version and os.path.exists(meta_path):
+            try:
+                with open(meta_path, "r") as f:
+                    meta = json.load(f)
+                if meta["version"] == version:
+                    self.index = INDEX_TYPES[meta["kind"]].load(self.index_dir)
+                    self.bm25 = BM25Index.load(self.index_dir)
+                    with open(os.path.join(self.index_dir, "chunks.json"), "r") as f:
+                        self.chunks = json.load(f)
+                    return self
+            except (OSError, ValueError, KeyError):
+                pass
+
+        stored = db.get(include=["embeddings", "documents", "metadatas"])
+        kind = self.index_type
+        if kind == "auto":
+            use_graph = self.graph_threshold is not None and len(stored["ids"]) >= self.graph_threshold
+            kind = "graph" if use_graph else "brute"
+        self.index = INDEX_TYPES[kind]().build(stored["ids"], stored["embeddings"])
+        self.bm25 = BM25Index().build(stored["ids"], stored["documents"])
+        self.chunks = {
+            chunk_id: [text, metadata or {}]
+            for chunk_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        if version:
+            self.index.save(self.index_dir)
+            self.bm25.save(self.index_dir)
+            with open(os.path.join(self.index_dir, "chunks.json"), "w") as f:
+                json.dump(self.chunks, f)
+            with open(meta_path, "w") as f:
+                json.dump({"version": version, "kind": kind, "chunks": len(self.index)}, f)
+        return self
+
+    def search(self, question, k=4, mode=None, query_vector=None):
+        """query_vector is the question's embedding, when the caller already has it."""
+        mode = mode or self.mode
+        depth = max(k, self.candidates) if mode == "hybrid" or self.rerank else k
+        query = query_vector
+        if query is None and mode != "bm25":
+            query = self.embedding_model.embed_query(question)
+        start = time.perf_counter()
+        rankings = []
+        if mode != "bm25":
+            rankings.append([chunk_id for chunk_id, _ in self.index.search(query, depth)])
+        if mode != "vector":
+            rankings.append([chunk_id for chunk_id, _ in self.bm25.search(question, depth)])
+        ranked = reciprocal_rank_fusion(rankings)[:depth] if len(rankings) > 1 else rankings[0]
+        if self.rerank and ranked:
+            scores = self.rerank(question, [self.chunks[chunk_id][0] for chunk_id in ranked])
+            order = sorted(range(len(ranked)), key=lambda i: scores[i], reverse=True)
+            ranked = [ranked[i] for i in order]
+        self.last_search_seconds = time.perf_counter() - start
+        return [
+            Document(page_content=self.chunks[chunk_id][0], metadata=self.chunks[chunk_id][1])
+            for chunk_id in ranked[:k]
+        ]
+
+
+_retrievers = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_retriever(chroma_path, version, make_store, embedding_model, index_type="auto"):
+    """Returns the cached Retriever for chroma_path, (re)loading it when version changes."""
+    key = (os.path.abspath(chroma_path), index_type)
+    with _retrievers_lock:
+        cached = _retrievers.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        retriever = Retriever(chroma_path, embedding_model, index_type).load(make_store(), version)
+        _retrievers[key] = (version, retriever)
+        return retriever
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+SEMANTIC_CACHE_PATH = os.path.join("cache", "rag", "semantic_cache.json")
+
+
+class SemanticCache:
+    """Answers to earlier questions about a document, matched by question embedding.
+
+    lookup returns a stored answer when an earlier question on the same document has
+    cosine similarity of at least threshold with the new one. Entries carry the store
+    version they were answered from, so re-indexing a document drops its answers.
+    Entries older than ttl_seconds expire and past max_entries the least recently used
+    go first. The cache is saved to path after every store, pass path=None to keep it
+    in memory only.
+    """
+
+    def __init__(self, threshold=0.92, ttl_seconds=7 * 24 * 3600, max_entries=512, path=SEMANTIC_CACHE_PATH):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def lookup(self, document, version, vector):
+        start = time.perf_counter()
+        with self._lock:
+            self._expire(document, version)
+            candidates = [(entry_id, entry) for entry_id, entry in self.entries.items() if entry["document"] == document]
+            if candidates:
+                matrix = np.array([entry["vector"] for _, entry in candidates], dtype=np.float32)
+                scores = matrix @ self._normalize(vector)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self.entries.move_to_end(entry_id)
+                    self.hits += 1
+                    self.seconds_saved += max(0.0, entry["seconds"] - (time.perf_counter() - start))
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, document, version, question, vector, answer, seconds):
+        """seconds is how long producing the answer took, what a later hit saves."""
+        if not answer:
+            return
+        with self._lock:
+            self.entries[self._next_id] = {
+                "document": document,
+                "version": version,
+                "question": question,
+                "vector": self._normalize(vector).tolist(),
+                "answer": answer,
+                "seconds": seconds,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+
+    def clear(self, document=None):
+        with self._lock:
+            for entry_id in [i for i, entry in self.entries.items() if document in (None, entry["document"])]:
+                del self.entries[entry_id]
+            self._save()
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+    def _expire(self, document, version):
+        deadline = time.time() - self.ttl_seconds
+        stale = [
+            entry_id for entry_id, entry in self.entries.items()
+            if entry["created"] < deadline or (entry["document"] == document and entry["version"] != version)
+        ]
+        for entry_id in stale:
+            del self.entries[entry_id]
+        if stale:
+            self._save()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Saved least recently used first, so the LRU order survives a restart
+        for entry in entries:
+            self.entries[self._next_id] = entry
+            self._next_id += 1
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(list(self.entries.values()), f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
@@ -1,71 +1,174 @@
-from customAgents.agent_llm import SimpleMultiModal, SimpleStreamLLM
+from customAgents.agent_llm import SimpleMultiModal, SimpleStreamLLM, llm_pool
+from customAgents.agent_llm.cancellation import is_cancelled
 from customAgents.agent_prompt import SimplePrompt
 from customAgents.runtime import SimpleRuntime
 import json
+import time
 
-from helpers import youtube_search
+from helpers import youtube_search, ResponseCache
+from RAG.create_db import semantic_cache
 
 with open("llm.json", "r") as f:
     config = json.load(f)
 
+response_cache = ResponseCache()
 
-def translate_ai(target_language, image):
+
+class Notice(str):
+    """A chunk that tells the user about the answer rather than being part of it, shown but never kept in chat memory."""
+
+
+def cached_stream(prompt_text, image, temperature, generate, cancel_token=None):
+    key = response_cache.make_key(config["model"], temperature, prompt_text, image)
+    cached = response_cache.get(key)
+    if cached is not None:
+        for chunk in response_cache.replay(cached):
+            if is_cancelled(cancel_token):
+                return
+            yield chunk
+        return
+    chunks = []
+    for chunk in generate(cancel_token=cancel_token):
+        chunks.append(chunk)
+        yield chunk
+    # Only complete answers are stored, an abandoned or cancelled stream leaves no entry
+    if not is_cancelled(cancel_token):
+        response_cache.put(key, "".join(chunks))
+
+
+def translate_ai(target_language, image, cancel_token=None):
     translate_text_prompt = f"Translate the following text in the image to {target_language}: (if the image is already on the target language, do not translate just clarify so then extract the text inside the image) JUST OUTPUT the translation directly without saying this is the translation of the text"
-    translate_llm = SimpleMultiModal(api_key=config["api_key"], model=config["model"], temperature=0.5)
+    translate_llm = llm_pool.get(SimpleMultiModal, api_key=config["api_key"], model=config["model"], temperature=0.5)
     translate_prompt = SimplePrompt(text=translate_text_prompt, image=image)
     translate_prompt.construct_prompt()
     translate_agent = SimpleRuntime(llm=translate_llm, prompt=translate_prompt)
     
-    for output in translate_agent.loop():
+    for output in cached_stream(translate_text_prompt, image, 0.5, translate_agent.stream, cancel_token):
         yield output
 
 
-def explain_ai(full_page_text, image):
+def explain_ai(full_page_text, image, cancel_token=None):
     explain_text_prompt = f"Explain and illustrate for the user the image he sent, try to explain the visuals or the text with better illustrations to help the user understand the context he passed to you, given this is the full page's context if it is gonna help, make sure to explain the part he gave to you in the image {full_page_text}"
-    explain_llm = SimpleMultiModal(api_key=config["api_key"], model=config["model"], temperature=0.5)
+    explain_llm = llm_pool.get(SimpleMultiModal, api_key=config["api_key"], model=config["model"], temperature=0.5)
     explain_prompt = SimplePrompt(text=explain_text_prompt, image=image)
     explain_prompt.construct_prompt()
     translate_agent = SimpleRuntime(llm=explain_llm, prompt=explain_prompt)
     
-    for output in translate_agent.loop():
+    for output in cached_stream(explain_text_prompt, image, 0.5, translate_agent.stream, cancel_token):
         yield output
 
 
-def ask_ai(question, full_page_text, image):
+def ask_ai(question, full_page_text, image, cancel_token=None):
     ask_text_prompt = f"Please provide a detailed answer to the following question based on the context provided in the image: '{question}'. Additionally, consider the full page context: '{full_page_text}'."
-    ask_llm = SimpleMultiModal(api_key=config["api_key"], model=config["model"], temperature=0.5)
+    ask_llm = llm_pool.get(SimpleMultiModal, api_key=config["api_key"], model=config["model"], temperature=0.5)
     ask_prompt = SimplePrompt(text=ask_text_prompt, image=image)
     ask_prompt.construct_prompt()
     ask_agent = SimpleRuntime(llm=ask_llm, prompt=ask_prompt)
     
-    for output in ask_agent.loop():
+    for output in cached_stream(ask_text_prompt, image, 0.5, ask_agent.stream, cancel_token):
         yield output
 
 
-def chat_ai(message):
+def chat_ai(message, history="", cancel_token=None):
     chat_text_prompt = f"User said: '{message}'. Please respond in a conversational manner."
-    chat_llm = SimpleStreamLLM(api_key=config["api_key"], model=config["model"], temperature=0.5)
+    if history:
+        chat_text_prompt = f"This is the conversation so far:\n{history}\n\n{chat_text_prompt}"
+    chat_llm = llm_pool.get(SimpleStreamLLM, api_key=config["api_key"], model=config["model"], temperature=0.5)
     chat_prompt = SimplePrompt(text=chat_text_prompt)
     chat_prompt.construct_prompt()
     chat_agent = SimpleRuntime(llm=chat_llm, prompt=chat_prompt)
     
-    for output in chat_agent.loop():
+    for output in chat_agent.stream(cancel_token=cancel_token):
         yield output
 
 
-def notes_ai(full_page_text, image):
+def document_chat_ai(message, history, document_rag, cancel_token=None):
+    if document_rag and document_rag.error is not None:
+        yield Notice(f"(The document index could not be built: {document_rag.error}. Answering without it.)\n\n")
+        yield from chat_ai(message, history, cancel_token=cancel_token)
+        return
+    start = time.perf_counter()
+    # Answers depend on the conversation too, only standalone questions of a fresh chat are
+    # cached, and short follow-ups like "why?" never are
+    question_vector = None
+    if document_rag and not history and len(message.split()) >= 3:
+        question_vector = document_rag.embed_question(message)
+    if question_vector is not None:
+        cached = semantic_cache.lookup(document_rag.cache_key, document_rag.version, question_vector)
+        if cached is not None:
+            document_rag.last_results = []
+            for chunk in response_cache.replay(cached):
+                if is_cancelled(cancel_token):
+                    return
+                yield chunk
+            return
+    docs = document_rag.retrieve(message, query_vector=question_vector) if document_rag else []
+    if document_rag and not document_rag.ready.is_set():
+        yield Notice("(The document index is still being built, answering without it.)\n\n")
+    context = "\n\n".join(f"[page {doc.metadata.get('page', 0) + 1}] {doc.page_content}" for doc in docs)
+    document_text_prompt = f"Answer the user's question about the document using the excerpts below, cite the page numbers you used and say so if the excerpts do not contain the answer.\nExcerpts:\n{context}\n\nUser asked: '{message}'"
+    if history:
+        document_text_prompt = f"This is the conversation so far:\n{history}\n\n{document_text_prompt}"
+    document_llm = llm_pool.get(SimpleStreamLLM, api_key=config["api_key"], model=config["model"], temperature=0.5)
+    document_prompt = SimplePrompt(text=document_text_prompt)
+    document_prompt.construct_prompt()
+    document_agent = SimpleRuntime(llm=document_llm, prompt=document_prompt)
+
+    chunks = []
+    for output in document_agent.stream(cancel_token=cancel_token):
+        chunks.append(output)
+        yield output
+    if question_vector is not None and not is_cancelled(cancel_token):
+        semantic_cache.store(
+            document_rag.cache_key, document_rag.version, message, question_vector, "".join(chunks),
+            time.perf_counter() - start
+        )
+
+
+def summarize_chat_ai(summary, transcript):
+    summarize_text_prompt = f"Update the running summary of a conversation between a user and an assistant. Current summary: '{summary}'. New turns to fold in:\n{transcript}\nKeep names, numbers, questions still open and anything the user asked to remember. JUST OUTPUT the updated summary in a few sentences."
+    summarize_llm = llm_pool.get(SimpleStreamLLM, api_key=config["api_key"], model=config["model"], temperature=0.2)
+    summarize_prompt = SimplePrompt(text=summarize_text_prompt)
+    summarize_prompt.construct_prompt()
+    summarize_agent = SimpleRuntime(llm=summarize_llm, prompt=summarize_prompt)
+
+    return "".join(summarize_agent.stream())
+
+
+def make_notes_agent(full_page_text, image):
     notes_text_prompt = f"Please provide a detailed summary of the following text: '{full_page_text}'. Additionally, consider the full page context: '{full_page_text}' Make sure to return the output as md and lines seperated by <br> tags for good view. preferred to make the notes as bullet points try to make 5 to 8 points max, don't write explainations just the notes directly as bullet points only"
-    notes_llm = SimpleMultiModal(api_key=config["api_key"], model=config["model"], temperature=0.5)
+    notes_llm = llm_pool.get(SimpleMultiModal, api_key=config["api_key"], model=config["model"], temperature=0.5)
     notes_prompt = SimplePrompt(text=notes_text_prompt, image=image)
     notes_prompt.construct_prompt()
     notes_agent = SimpleRuntime(llm=notes_llm, prompt=notes_prompt)
-    
-    return notes_agent.loop()
+    key = response_cache.make_key(config["model"], 0.5, notes_text_prompt, image)
+    return key, notes_agent
+
+
+def notes_ai(full_page_text, image):
+    key, notes_agent = make_notes_agent(full_page_text, image)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    notes = notes_agent.loop()
+    response_cache.put(key, notes)
+    return notes
+
+
+async def anotes_ai(full_page_text, image):
+    # Same as notes_ai but awaits the model, so notes for many pages can share one event loop
+    key, notes_agent = make_notes_agent(full_page_text, image)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    notes = await notes_agent.aloop()
+    response_cache.put(key, notes)
+    return notes
 
 
 def search_ai(full_page_text, image):
     search_text_prompt = f"your task is to look here at this text: '{full_page_text}'. Additionally, consider the image provided for any visual context: '{image}'. then write a single query that can be used to get youtube title for searching and recommending youtube videos, just without explianations output the title so that it can be used to get the videos"
-    search_llm = SimpleMultiModal(api_key=config["api_key"], model=config["model"], temperature=0.5)
+    search_llm = llm_pool.get(SimpleMultiModal, api_key=config["api_key"], model=config["model"], temperature=0.5)
     search_prompt = SimplePrompt(text=search_text_prompt, image=image)
     search_prompt.construct_prompt()
     search_agent = SimpleRuntime(llm=search_llm, prompt=search_prompt)
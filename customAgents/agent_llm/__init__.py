@@ -9,6 +9,8 @@ Classes:
 - SimpleStreamLLM: A variant of SimpleLLM that supports streaming responses.
 - BaseMultiModal: The base class for multimodal models, allowing interaction with both text and image inputs.
 - SimpleMultiModal: A simple implementation of a multimodal model.
+- LLMPool: A registry handing out long-lived, shared model instances.
+- CancellationToken: A flag that stops a streaming call early.
 
 Usage:
 Import the desired classes from this module to create and interact with language models and multimodal models.
@@ -18,6 +20,8 @@ from .base_llm import BaseLLM
 from .base_multimodal import BaseMultiModal
 from .simple_llm import SimpleLLM, SimpleInvokeLLM, SimpleStreamLLM
 from .simple_multimodal import SimpleMultiModal
+from .llm_pool import LLMPool, llm_pool
+from .cancellation import CancellationToken
 
 __all__ = [
     'BaseLLM',          # Base class for all LLMs, providing common functionality.
@@ -25,7 +29,10 @@ __all__ = [
     'SimpleInvokeLLM', # LLM that supports invocation.
     'SimpleStreamLLM', # LLM that supports streaming responses.
     'BaseMultiModal',   # Base class for multimodal models, allowing interaction with text and images.
-    'SimpleMultiModal'  # Simple implementation of a multimodal model.
+    'SimpleMultiModal', # Simple implementation of a multimodal model.
+    'LLMPool',          # Registry of long-lived model instances keyed by settings.
+    'llm_pool',         # Process-wide default LLMPool.
+    'CancellationToken' # Stops a streaming call early.
 ]
 
 __doc__ = """
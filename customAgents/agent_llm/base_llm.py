@@ -1,9 +1,10 @@
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Iterator, Optional
 from colorama import Fore, Style
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
+from customAgents.agent_llm.cancellation import is_cancelled, until_cancelled
 
 
 class BaseLLM:
@@ -143,6 +144,27 @@ class BaseLLM:
         return ''.join(chunks)
 
 
+    def stream_response(self, input: str, cancel_token: Any = None) -> Iterator[str]:
+        """
+        Streams the response from the chain, yielding each chunk as soon as the provider sends it.
+
+        :param input: The input string to generate a response for.
+        :param cancel_token: Optional CancellationToken, once cancelled no further chunk is pulled and the provider stream is closed.
+        :raises ValueError: If the llm chain is not initialized.
+        :return: An iterator over the response chunks.
+        """
+
+        if self._chain is None:
+            raise ValueError("LLM chain is not initialized.")
+        if is_cancelled(cancel_token):
+            return
+
+        # The model stream is fed to the parser through until_cancelled rather than using
+        # self._chain.stream, whose close() would drain the rest of the model stream first
+        model_stream = until_cancelled(self._chain.first.stream(input), cancel_token)
+        yield from until_cancelled(self._chain.last.transform(model_stream), cancel_token)
+
+
     def invoke_response(self, input: str) -> str:
         """
         Directly invokes the LLM with the given input and returns the response.
@@ -166,6 +188,58 @@ class BaseLLM:
         """
 
         return self.invoke_response(input=input)
+
+
+    def llm_stream(self, input: str, cancel_token: Any = None) -> Iterator[str]:
+        """
+        method for interfacing with runtime streaming (used inside BaseRuntime.stream), yields the
+        provider chunks as they arrive instead of joining them.
+
+        :param input: The input string to generate a response for.
+        :param cancel_token: Optional CancellationToken that stops the stream.
+        """
+
+        return self.stream_response(input=input, cancel_token=cancel_token)
+    
+
+    async def agenerate(self, input: str) -> str:
+        """
+        Asynchronously generates the full response through the chain's LangChain ainvoke API, so
+        many requests can wait on one event loop instead of holding a thread each.
+
+        :param input: The input string to generate a response for.
+        :raises ValueError: If the llm chain is not initialized.
+        :return: The generated response as a string.
+        """
+
+        if self._chain is None:
+            raise ValueError("LLM chain is not initialized.")
+        return await self._chain.ainvoke(input)
+
+
+    async def astream(self, input: str, cancel_token: Any = None) -> AsyncIterator[str]:
+        """
+        Asynchronously streams the response through the chain's LangChain astream API.
+
+        :param input: The input string to generate a response for.
+        :param cancel_token: Optional CancellationToken that stops the stream.
+        :raises ValueError: If the llm chain is not initialized.
+        :return: An async iterator over the response chunks.
+        """
+
+        if self._chain is None:
+            raise ValueError("LLM chain is not initialized.")
+        if is_cancelled(cancel_token):
+            return
+
+        stream = self._chain.astream(input)
+        try:
+            async for chunk in stream:
+                yield chunk
+                if is_cancelled(cancel_token):
+                    break
+        finally:
+            await stream.aclose()
     
 
     def _print_colorized_output(self, chunk: str, output_style: str) -> None:
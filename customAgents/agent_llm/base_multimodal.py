@@ -1,10 +1,11 @@
 from colorama import Fore, Style
-from typing import Any, List, Union
+from typing import Any, AsyncIterator, Iterator, List, Union
 from PIL import Image
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain.schema import HumanMessage, AIMessage
+from customAgents.agent_llm.cancellation import is_cancelled, until_cancelled
 import io
 import base64
 import warnings
@@ -54,7 +55,7 @@ class BaseMultiModal:
         else:
             raise ValueError('Model not supported. Currently supported models: gemini, gpt, claude')
 
-    def multimodal_generate(self, prompt: str, image: Union[Image.Image, None] = None, stream: bool = False, output_style: str = 'default') -> str:
+    def _make_message_content(self, prompt: str, image: Union[Image.Image, None] = None) -> HumanMessage:
 
         content = [{"type": "text", "text": prompt}]
         
@@ -68,7 +69,11 @@ class BaseMultiModal:
             }
             content.append(img_data)
 
-        multimodal_message = HumanMessage(content=content)
+        return HumanMessage(content=content)
+
+    def multimodal_generate(self, prompt: str, image: Union[Image.Image, None] = None, stream: bool = False, output_style: str = 'default') -> str:
+
+        multimodal_message = self._make_message_content(prompt=prompt, image=image)
 
         if stream:
             response_generator = self._multi_modal.stream([multimodal_message])
@@ -92,6 +97,58 @@ class BaseMultiModal:
                 self._print_colorized_output(chunk=response_text, output_style=output_style)
             return response_text
 
+    def multimodal_stream(self, prompt: str, image: Union[Image.Image, None] = None, cancel_token: Any = None) -> Iterator[str]:
+        """
+        Streams the model response, yielding each chunk's text as soon as the provider sends it.
+
+        :param prompt: The text prompt.
+        :param image: An optional PIL image sent along with the prompt.
+        :param cancel_token: Optional CancellationToken, once cancelled no further chunk is pulled and the provider stream is closed.
+        :return: An iterator over the response chunks.
+        """
+        if is_cancelled(cancel_token):
+            return
+        multimodal_message = self._make_message_content(prompt=prompt, image=image)
+        for chunk in until_cancelled(self._multi_modal.stream([multimodal_message]), cancel_token):
+            if chunk.content:
+                yield chunk.content
+
+    async def agenerate(self, prompt: str, image: Union[Image.Image, None] = None) -> str:
+        """
+        Asynchronously generates the full response through the LangChain ainvoke API.
+
+        :param prompt: The text prompt.
+        :param image: An optional PIL image sent along with the prompt.
+        :return: The response text.
+        """
+        multimodal_message = self._make_message_content(prompt=prompt, image=image)
+        response = await self._multi_modal.ainvoke([multimodal_message])
+        if isinstance(response, AIMessage):
+            return response.content
+        return str(response)
+
+    async def astream(self, prompt: str, image: Union[Image.Image, None] = None, cancel_token: Any = None) -> AsyncIterator[str]:
+        """
+        Asynchronously streams the response through the LangChain astream API.
+
+        :param prompt: The text prompt.
+        :param image: An optional PIL image sent along with the prompt.
+        :param cancel_token: Optional CancellationToken that stops the stream.
+        :return: An async iterator over the response chunks.
+        """
+        if is_cancelled(cancel_token):
+            return
+        multimodal_message = self._make_message_content(prompt=prompt, image=image)
+        stream = self._multi_modal.astream([multimodal_message])
+        try:
+            async for chunk in stream:
+                if chunk.content:
+                    yield chunk.content
+                if is_cancelled(cancel_token):
+                    break
+        finally:
+            await stream.aclose()
+
     def _print_colorized_output(self, chunk: str, output_style: str) -> None:
         """
         Method for customizing output color
@@ -0,0 +1,36 @@
+import threading
+
+
+class CancellationToken(threading.Event):
+    """
+    A thread-safe flag passed down to streaming calls. Once cancel() is called, stream loops stop
+    pulling chunks from the provider and close the underlying stream.
+    """
+
+    def cancel(self) -> None:
+        self.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.is_set()
+
+
+def is_cancelled(cancel_token) -> bool:
+    """True if cancel_token is given and has been cancelled, a None token never cancels."""
+    return cancel_token is not None and cancel_token.is_set()
+
+
+def until_cancelled(iterator, cancel_token):
+    """
+    Yields from iterator until cancel_token is cancelled, checking before every next chunk is pulled,
+    then closes it. Consumers that drain their input on close (LangChain's sync transform does, for
+    tracing) therefore stop at the cancellation point instead of reading the whole stream.
+    """
+    try:
+        for chunk in iterator:
+            yield chunk
+            if is_cancelled(cancel_token):
+                break
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
@@ -0,0 +1,94 @@
+import threading
+from typing import Any, Dict, Hashable, Type
+
+
+class LLMPool:
+    def __init__(self):
+        """
+        Registry of long-lived LLM wrappers (BaseLLM / BaseMultiModal subclasses) keyed by
+        class and constructor settings. Building a wrapper creates a new LangChain chat client
+        with its own HTTP session, so callers that send many short requests should ask the pool
+        instead of constructing a wrapper per request. The underlying chat clients are safe to
+        share between threads, the wrappers are never mutated by the pool.
+        """
+
+        self._instances: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    def get(self, llm_class: Type, **kwargs: Any) -> Any:
+        """
+        Returns the pooled instance of llm_class for the given settings, creating it on first use.
+
+        :param llm_class: The wrapper class to instantiate (e.g. SimpleMultiModal).
+        :param **kwargs: Constructor keyword arguments, they are part of the pool key.
+        :return: A shared llm_class instance.
+        """
+
+        key = (llm_class, self._freeze(kwargs))
+        with self._lock:
+            llm = self._instances.get(key)
+            if llm is None:
+                llm = llm_class(**kwargs)
+                self._instances[key] = llm
+                self.misses += 1
+            else:
+                self.hits += 1
+        return llm
+
+
+    def clear(self) -> None:
+        """
+        Drops every pooled instance, the next get() builds fresh clients.
+        """
+
+        with self._lock:
+            self._instances.clear()
+
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+
+    @classmethod
+    def _freeze(cls, value: Any) -> Hashable:
+        if isinstance(value, dict):
+            return tuple(sorted((key, cls._freeze(item)) for key, item in value.items()))
+        if isinstance(value, (list, tuple, set)):
+            return tuple(cls._freeze(item) for item in value)
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return repr(value)
+
+
+llm_pool = LLMPool()
+
+
+if __name__ == "__main__":
+    # Microbenchmark: per-request wrapper construction vs pooled lookup.
+    # The fake provider is an OpenAI-compatible client pointed at a closed local port,
+    # constructing it never touches the network.
+    import time
+    from customAgents.agent_llm import SimpleStreamLLM
+
+    settings = dict(api_key="fake", model="gpt-fake", temperature=0.5, base_url="http://127.0.0.1:9")
+    n_requests = 200
+
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        SimpleStreamLLM(**settings)
+    per_call = (time.perf_counter() - start) / n_requests
+
+    pool = LLMPool()
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        pool.get(SimpleStreamLLM, **settings)
+    pooled = (time.perf_counter() - start) / n_requests
+
+    print(f"construct per request: {per_call * 1000:.3f} ms")
+    print(f"pooled lookup:         {pooled * 1000:.3f} ms")
+    print(f"overhead removed:      {(per_call - pooled) * 1000:.3f} ms/request")
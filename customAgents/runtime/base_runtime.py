@@ -1,6 +1,7 @@
 import json
-from typing import Union
+from typing import Any, AsyncIterator, Iterator, Union
 from customAgents.agent_llm import BaseLLM, BaseMultiModal
+from customAgents.agent_llm.cancellation import is_cancelled
 from customAgents.agent_prompt import BasePrompt
 from customAgents.agent_tools import ToolKit
 
@@ -61,6 +62,87 @@ class BaseRuntime:
         return response
     
 
+    def stream(self, query: str = None, cancel_token: Any = None) -> Iterator[str]:
+        """
+        Streams the response to the current agent prompt, yielding chunks as the model produces them.
+        Once the stream is exhausted the full response is appended to the prompt, like loop() does.
+
+        :param query: Optional text appended to the prompt for this step.
+        :param cancel_token: Optional CancellationToken, a cancelled stream stops early and its partial response is not kept.
+        :raises ValueError: If the LLM or agent prompt is not properly initialized.
+        :return: An iterator over the response chunks.
+        """
+        if not self.llm or not self.prompt:
+            raise ValueError("LLM or agent prompt is not properly initialized.")
+        input_query = self.prompt.prompt if query is None else self.prompt.prompt + f"\n{query}"
+        if isinstance(self.llm, BaseLLM):
+            chunks = self.llm.llm_stream(input=input_query, cancel_token=cancel_token)
+        else:
+            chunks = self.llm.multimodal_stream(prompt=input_query, image=self.prompt.image, cancel_token=cancel_token)
+
+        response = []
+        for chunk in chunks:
+            response.append(chunk)
+            yield chunk
+        if not is_cancelled(cancel_token):
+            self.prompt.prompt += "\n" + "".join(response)
+
+
+    async def astep(self, query: str = None) -> str:
+        """
+        Async counterpart of step(), awaiting the LLM instead of blocking a thread on it.
+
+        :param query: Optional text appended to the prompt for this step.
+        :raises ValueError: If the LLM or agent prompt is not properly initialized.
+        :return: The generated response as a string.
+        """
+        if not self.llm or not self.prompt:
+            raise ValueError("LLM or agent prompt is not properly initialized.")
+        input_query = self.prompt.prompt if query is None else self.prompt.prompt + f"\n{query}"
+        if isinstance(self.llm, BaseLLM):
+            return await self.llm.agenerate(input=input_query)
+        return await self.llm.agenerate(prompt=input_query, image=self.prompt.image)
+
+
+    async def aloop(self, n_steps: int = 1, query: str = None) -> str:
+        """
+        Async counterpart of loop().
+
+        :param n_steps: The number of steps to generate responses for.
+        :return: The final response generated after the specified number of steps.
+        """
+        for _ in range(n_steps):
+            response = await self.astep(query=query)
+            self.prompt.prompt += f"\n{response}"
+
+        return response
+
+
+    async def astream(self, query: str = None, cancel_token: Any = None) -> AsyncIterator[str]:
+        """
+        Async counterpart of stream(), the full response is appended to the prompt once the stream ends.
+
+        :param query: Optional text appended to the prompt for this step.
+        :param cancel_token: Optional CancellationToken, a cancelled stream stops early and its partial response is not kept.
+        :raises ValueError: If the LLM or agent prompt is not properly initialized.
+        :return: An async iterator over the response chunks.
+        """
+        if not self.llm or not self.prompt:
+            raise ValueError("LLM or agent prompt is not properly initialized.")
+        input_query = self.prompt.prompt if query is None else self.prompt.prompt + f"\n{query}"
+        if isinstance(self.llm, BaseLLM):
+            chunks = self.llm.astream(input=input_query, cancel_token=cancel_token)
+        else:
+            chunks = self.llm.astream(prompt=input_query, image=self.prompt.image, cancel_token=cancel_token)
+
+        response = []
+        async for chunk in chunks:
+            response.append(chunk)
+            yield chunk
+        if not is_cancelled(cancel_token):
+            self.prompt.prompt += "\n" + "".join(response)
+
+
     def _extract_json_from_string(self, text: str):
         """
         Extracts JSON objects from a string.
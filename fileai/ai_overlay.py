@@ -14,11 +14,19 @@ import wave
 import numpy as np
 import markdown
 
-from call_ai import ask_ai, explain_ai, translate_ai, chat_ai, notes_ai, search_ai
-from helpers import load_icon
+from call_ai import ask_ai, explain_ai, translate_ai, chat_ai, notes_ai, search_ai, summarize_chat_ai, document_chat_ai, Notice
+from helpers import load_icon, ChatMemory
+from helpers.response_cache import image_digest
+from fileai.ui_dispatcher import UIDispatcher
+from fileai.ai_scheduler import ai_scheduler
 
 pygame.mixer.init()
 
+TMP_DIR = "tmp"
+TMP_IMAGE_PREFIX = "pdf_ai_tmp_image_"
+# Selection images older than this are no longer read by any request and are deleted
+TMP_IMAGE_MAX_AGE = 3600
+
 class AIOverlay:
     def __init__(self, root, pdf_handler):
         self.root = root
@@ -27,11 +35,20 @@ class AIOverlay:
         self.pdf_handler.selection_callback = self.handle_selection
         self.selection_overlay_id = None
         self.selected_cropped_image = None
+        self.ui_dispatcher = UIDispatcher(root)
+        self.chat_memory = ChatMemory(token_budget=2000, summarize=summarize_chat_ai)
+        # Images left by an earlier session are never read again
+        self.prune_tmp_images(max_age=0)
         self.setup_chat_panel()
 
         # Variables for response popup and TTS
         self.response_popup = None
-        self.current_response_text = ""
+        self.response_task = None
+        self.search_task = None
+        self.chat_task = None
+        self.response_language = "en"
+        self.response_rendered_len = 0
+        self.response_rtl_done = 0
         self.streaming_in_progress = False
         self.tts_streaming = False
         self.tts_read_index = 0
@@ -87,17 +104,19 @@ class AIOverlay:
         question = self.ask_entry.get().strip()
         self.ask_popup.destroy()
         tmp_image_path = self.save_image_to_tmp(self.selected_cropped_image) if self.selected_cropped_image else None
-        def threaded_ask():
-            generator = ask_ai(question, self.pdf_handler.page_text, tmp_image_path)
-            self.root.after(1, lambda: self.show_response_popup(generator, language_code="en"))
-        threading.Thread(target=threaded_ask, daemon=True).start()
+        page_text = self.pdf_handler.page_text
+        self.show_response_popup(
+            lambda token: ask_ai(question, page_text, tmp_image_path, cancel_token=token), language_code="en",
+            action="ask", key=("ask", question, page_text, tmp_image_path)
+        )
 
     def explain_ai_overlay(self):
         tmp_image_path = self.save_image_to_tmp(self.selected_cropped_image) if self.selected_cropped_image else None
-        def threaded_explain():
-            generator = explain_ai(self.pdf_handler.page_text, tmp_image_path)
-            self.root.after(2, lambda: self.show_response_popup(generator, language_code="en"))
-        threading.Thread(target=threaded_explain, daemon=True).start()
+        page_text = self.pdf_handler.page_text
+        self.show_response_popup(
+            lambda token: explain_ai(page_text, tmp_image_path, cancel_token=token), language_code="en",
+            action="explain", key=("explain", page_text, tmp_image_path)
+        )
 
     def translate_ai_popup(self):
         self.translate_popup = tk.Toplevel(self.root)
@@ -124,10 +143,10 @@ class AIOverlay:
         language_code = lang_mapping.get(target_lang, "en")
         self.translate_popup.destroy()
         tmp_image_path = self.save_image_to_tmp(self.selected_cropped_image) if self.selected_cropped_image else None
-        def threaded_translate():
-            generator = translate_ai(target_lang, tmp_image_path)
-            self.root.after(0, lambda: self.show_response_popup(generator, language_code=language_code))
-        threading.Thread(target=threaded_translate, daemon=True).start()
+        self.show_response_popup(
+            lambda token: translate_ai(target_lang, tmp_image_path, cancel_token=token), language_code=language_code,
+            action="translate", key=("translate", target_lang, tmp_image_path)
+        )
 
     def search_ai_overlay(self):
         self.search_popup = tk.Toplevel(self.root)
@@ -136,18 +155,28 @@ class AIOverlay:
         self.search_popup.grab_set()
         waiting_label = ttk.Label(self.search_popup, text="Searching for YouTube videos, please wait...")
         waiting_label.pack(padx=10, pady=(10, 5))
-        cancel_button = ttk.Button(self.search_popup, text="Cancel", command=self.search_popup.destroy)
+        cancel_button = ttk.Button(self.search_popup, text="Cancel", command=self.cancel_search)
         cancel_button.pack(pady=(0, 10))
+        self.search_popup.protocol("WM_DELETE_WINDOW", self.cancel_search)
         tmp_image_path = self.save_image_to_tmp(self.selected_cropped_image) if self.selected_cropped_image else None
-        def threaded_search():
-            youtube_results = search_ai(self.pdf_handler.page_text, tmp_image_path)
-            self.root.after(0, lambda: self.search_popup.destroy())
+        page_text = self.pdf_handler.page_text
+        search_popup = self.search_popup
+        def run_search(task):
+            youtube_results = search_ai(page_text, tmp_image_path)
+            if task.cancelled.is_set():
+                return
+            self.root.after(0, lambda: search_popup.destroy())
             if youtube_results:
                 self.root.after(0, lambda: self.show_youtube_results_popup(youtube_results))
             else:
                 response_text = "No results found."
-                self.root.after(0, lambda: self.show_response_popup(iter([response_text]), language_code="en"))
-        threading.Thread(target=threaded_search, daemon=True).start()
+                self.root.after(0, lambda: self.show_response_popup(lambda token: iter([response_text]), language_code="en"))
+        self.search_task = ai_scheduler.submit("search", run_search, key=("search", page_text, tmp_image_path))
+
+    def cancel_search(self):
+        if self.search_task is not None:
+            self.search_task.cancel()
+        self.search_popup.destroy()
 
     def show_youtube_results_popup(self, results):
         popup = tk.Toplevel(self.root)
@@ -192,8 +221,15 @@ class AIOverlay:
             description_label.bind("<Enter>", on_enter)
             description_label.bind("<Leave>", on_leave)
 
-    def show_response_popup(self, response_generator, language_code="en"):
-        if self.response_popup and self.response_popup.winfo_exists():
+    def show_response_popup(self, make_generator, language_code="en", action="ask", key=None):
+        popup_open = self.response_popup is not None and self.response_popup.winfo_exists()
+        if popup_open and key is not None and self.response_task is not None and self.response_task.key == key and self.response_task.active:
+            # The same request is already streaming into the open popup
+            self.response_popup.lift()
+            return
+        if self.response_task is not None:
+            self.response_task.cancel()
+        if popup_open:
             self.response_popup.destroy()
         self.response_popup = tk.Toplevel(self.root)
         self.response_popup.title("AI Response")
@@ -206,8 +242,12 @@ class AIOverlay:
         response_scroll = ttk.Scrollbar(response_frame, orient="vertical", command=self.response_area.yview)
         response_scroll.pack(side=tk.RIGHT, fill="y")
         self.response_area.config(yscrollcommand=response_scroll.set)
-        self.current_response_text = ""
+        self.response_language = language_code
+        self.response_rendered_len = 0
+        self.response_rtl_done = 0
         self.response_area.tag_config("arabic", font=("Arial", 12), justify="right")
+        self.response_area.mark_set("rtl_partial", "1.0")
+        self.response_area.mark_gravity("rtl_partial", tk.LEFT)
         btn_frame = ttk.Frame(self.response_popup)
         btn_frame.pack(pady=(5,10))
         self.read_button = ttk.Button(btn_frame, text="🔊 Read Aloud", command=lambda: self.read_aloud_after_stream(language_code))
@@ -216,29 +256,60 @@ class AIOverlay:
         close_button.pack(side=tk.LEFT, padx=5)
         self.response_popup.protocol("WM_DELETE_WINDOW", self.close_response_popup)
         self.streaming_in_progress = True
-        threading.Thread(target=self._stream_response_thread, args=(response_generator,), daemon=True).start()
+        self.response_task = ai_scheduler.submit(action, lambda task: self._stream_response(task, make_generator), key=key)
 
-    def _stream_response_thread(self, generator):
+    def _stream_response(self, task, make_generator):
+        # The task's token reaches the model stream loop, cancelling it stops pulling chunks upstream
+        generator = make_generator(task.cancelled)
         try:
             for chunk in generator:
-                self.current_response_text += chunk
-                self.root.after(0, self._update_response_area)
-        except StopIteration:
-            pass
+                if task.cancelled.is_set():
+                    break
+                # Each task streams into its own buffer, a stale chunk can't reach a newer popup
+                task.output += chunk
+                self.ui_dispatcher.post(("response_area", task), lambda: self._update_response_area(task))
         finally:
-            self.streaming_in_progress = False
-
-    def _update_response_area(self):
+            if hasattr(generator, "close"):
+                generator.close()
+            if task is self.response_task:
+                self.streaming_in_progress = False
+                self.ui_dispatcher.post(("response_area", task), lambda: self._update_response_area(task))
+
+    @property
+    def current_response_text(self):
+        # Text streamed so far into the open popup
+        return self.response_task.output if self.response_task is not None else ""
+
+    def _update_response_area(self, task):
+        if task is not self.response_task or not self.response_popup or not self.response_popup.winfo_exists():
+            return
+        text = task.output
+        if len(text) <= self.response_rendered_len:
+            return
         self.response_area.config(state=tk.NORMAL)
-        self.response_area.delete("1.0", tk.END)
-        if "ar" in self.response_area.tag_names():
-            reshaped_text = arabic_reshaper.reshape(self.current_response_text)
-            display_text = "\u202E" + get_display(reshaped_text) + "\u202C"
-            self.response_area.insert(tk.END, display_text, "arabic")
+        if self.response_language == "ar":
+            self._append_rtl_text(text)
         else:
-            self.response_area.insert(tk.END, self.current_response_text)
+            self.response_area.insert(tk.END, text[self.response_rendered_len:])
+        self.response_rendered_len = len(text)
         self.response_area.config(state=tk.DISABLED)
 
+    def _append_rtl_text(self, text):
+        # Finished lines are shaped once, only the trailing partial line is re-shaped per frame
+        pending = text[self.response_rtl_done:]
+        last_newline = pending.rfind("\n")
+        complete, partial = pending[:last_newline + 1], pending[last_newline + 1:]
+        self.response_area.delete("rtl_partial", "end-1c")
+        for line in complete.splitlines():
+            self.response_area.insert(tk.END, self._shape_rtl(line) + "\n", "arabic")
+        self.response_rtl_done += len(complete)
+        self.response_area.mark_set("rtl_partial", "end-1c")
+        if partial:
+            self.response_area.insert(tk.END, self._shape_rtl(partial), "arabic")
+
+    def _shape_rtl(self, line):
+        return "\u202E" + get_display(arabic_reshaper.reshape(line)) + "\u202C"
+
     def read_aloud_after_stream(self, language_code):
         if self.tts_streaming:
             return
@@ -281,18 +352,33 @@ class AIOverlay:
                 self.current_audio_file = None
         except Exception:
             pass
+        if self.response_task is not None:
+            self.response_task.cancel()
         if self.response_popup and self.response_popup.winfo_exists():
             self.response_popup.destroy()
 
     def save_image_to_tmp(self, image):
-        tmp_dir = "tmp"
-        if not os.path.exists(tmp_dir):
-            os.makedirs(tmp_dir)
-        filename = "pdf_ai_tmp_image.png"
-        tmp_path = os.path.join(tmp_dir, filename)
+        if not os.path.exists(TMP_DIR):
+            os.makedirs(TMP_DIR)
+        self.prune_tmp_images(TMP_IMAGE_MAX_AGE)
+        # Named by content, so a queued request never reads an image saved for a later one
+        filename = f"{TMP_IMAGE_PREFIX}{image_digest(image)[:16]}.png"
+        tmp_path = os.path.join(TMP_DIR, filename)
         image.save(tmp_path)
         return tmp_path
 
+    def prune_tmp_images(self, max_age):
+        if not os.path.isdir(TMP_DIR):
+            return
+        cutoff = time.time() - max_age
+        for filename in os.listdir(TMP_DIR):
+            path = os.path.join(TMP_DIR, filename)
+            try:
+                if filename.startswith(TMP_IMAGE_PREFIX) and os.path.getmtime(path) <= cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
     def setup_chat_panel(self):
         self.chat_frame = ttk.Frame(self.root, width=350)
         self.chat_frame.pack(side=tk.RIGHT, fill=tk.Y)
@@ -306,6 +392,9 @@ class AIOverlay:
         title_label.pack(side=tk.LEFT, padx=5)
         close_btn = tk.Button(top_bar, text="X", font=("Segoe UI", 10, "bold"), bg="#F7F7F7", fg="red", bd=0, command=self.toggle_chat)
         close_btn.pack(side=tk.RIGHT, padx=5)
+        self.doc_chat_var = tk.BooleanVar(value=True)
+        doc_chat_check = tk.Checkbutton(top_bar, text="Whole document", variable=self.doc_chat_var, bg="#F7F7F7", font=("Segoe UI", 9))
+        doc_chat_check.pack(side=tk.RIGHT, padx=5)
         self.chat_log_frame = ttk.Frame(self.chat_frame)
         self.chat_log_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.chat_log = tk.Text(self.chat_log_frame, wrap=tk.WORD, state=tk.DISABLED, font=("Segoe UI", 11), bg="#F7F7F7", fg="#0D47A1", bd=0)
@@ -343,17 +432,38 @@ class AIOverlay:
             self.append_chat_message("You", message)
             self.chat_input.delete("1.0", tk.END)
             ai_label = self.append_chat_message("AI", "")
-            threading.Thread(target=self._process_chat_ai, args=(message, ai_label), daemon=True).start()
-
-    def _process_chat_ai(self, message, ai_label):
+            document_rag = self.pdf_handler.document_rag if self.doc_chat_var.get() else None
+            # A new message supersedes an answer that is still streaming
+            if self.chat_task is not None:
+                self.chat_task.cancel()
+            self.chat_task = ai_scheduler.submit(
+                "chat", lambda task: self._process_chat_ai(message, ai_label, document_rag, task.cancelled)
+            )
+
+    def _process_chat_ai(self, message, ai_label, document_rag=None, cancel_token=None):
         try:
-            generator = chat_ai(message)
+            if document_rag is not None:
+                generator = document_chat_ai(message, self.chat_memory.context(), document_rag, cancel_token=cancel_token)
+            else:
+                generator = chat_ai(message, self.chat_memory.context(), cancel_token=cancel_token)
+            # Notices are shown above the answer but stay out of chat memory
+            notices = ""
             partial_text = ""
             for chunk in generator:
-                partial_text += chunk
-                self.root.after(0, lambda pt=partial_text: ai_label.config(text=pt))
+                if isinstance(chunk, Notice):
+                    notices += chunk
+                else:
+                    partial_text += chunk
+                self.ui_dispatcher.post(ai_label, lambda pt=notices + partial_text: ai_label.config(text=pt))
+            if cancel_token is not None and cancel_token.cancelled:
+                self.ui_dispatcher.post(ai_label, lambda pt=notices + partial_text: ai_label.config(text=pt + " [stopped]"))
+                return
+            self.chat_memory.add("user", message)
+            self.chat_memory.add("assistant", partial_text)
+            if document_rag is not None:
+                self.ui_dispatcher.post("rag_highlights", lambda docs=document_rag.last_results: self.pdf_handler.highlight_chunks(docs))
         except Exception as e:
-            self.root.after(1, lambda: ai_label.config(text="Error: " + str(e)))
+            self.ui_dispatcher.post(ai_label, lambda err=str(e): ai_label.config(text="Error: " + err))
 
     def append_chat_message(self, sender, message):
         self.chat_log.config(state=tk.NORMAL)
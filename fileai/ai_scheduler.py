@@ -0,0 +1,120 @@
+import itertools
+import queue
+import threading
+
+from customAgents.agent_llm.cancellation import CancellationToken
+
+# Lower runs first: the user is waiting on chat and popups, notes can wait
+PRIORITIES = {"chat": 0, "ask": 1, "explain": 1, "translate": 1, "search": 2, "note": 5}
+DEFAULT_PRIORITY = 3
+
+
+class AITask:
+    """
+    One scheduled AI request. fn(task) runs on a worker and should stop early once task.cancelled is set,
+    the simplest way being to pass task.cancelled on as the cancel_token of the call_ai generators.
+    """
+
+    def __init__(self, action, fn, key, priority):
+        self.action = action
+        self.fn = fn
+        self.key = key
+        self.priority = priority
+        self.cancelled = CancellationToken()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Text streamed so far, for tasks that stream a response
+        self.output = ""
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def active(self):
+        return not self.done.is_set() and not self.cancelled.is_set()
+
+
+class AIScheduler:
+    """Runs AI requests on a fixed pool of worker threads, highest priority first.
+
+    A request submitted with a key while another request with the same key is still
+    queued or running is not run twice, the caller gets the task already in flight.
+    Cancelled tasks that have not started yet are dropped when they reach a worker.
+    """
+
+    def __init__(self, max_workers=3):
+        self.max_workers = max_workers
+        self.submitted = 0
+        self.deduplicated = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def submit(self, action, fn, key=None, priority=None):
+        with self._lock:
+            if key is not None:
+                existing = self._in_flight.get(key)
+                if existing is not None and existing.active:
+                    self.deduplicated += 1
+                    return existing
+            if priority is None:
+                priority = PRIORITIES.get(action, DEFAULT_PRIORITY)
+            task = AITask(action, fn, key, priority)
+            if key is not None:
+                self._in_flight[key] = task
+            self.submitted += 1
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        self._queue.put((priority, next(self._sequence), task))
+        return task
+
+    def cancel_all(self, action=None):
+        with self._lock:
+            for task in self._in_flight.values():
+                if action in (None, task.action):
+                    task.cancel()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": len(self._in_flight),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "cancelled": self.cancelled,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def _work(self):
+        while True:
+            _, _, task = self._queue.get()
+            try:
+                if task.cancelled.is_set():
+                    self.cancelled += 1
+                    continue
+                task.result = task.fn(task)
+                self.completed += 1
+            except Exception as e:
+                task.error = e
+                self.failed += 1
+                print(f"AI {task.action} error:", e)
+            finally:
+                with self._lock:
+                    if task.key is not None and self._in_flight.get(task.key) is task:
+                        del self._in_flight[task.key]
+                task.done.set()
+
+
+ai_scheduler = AIScheduler()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import markdown
+
+from customAgents.agent_llm.cancellation import is_cancelled
+from fileai.render_cache import render_page
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def ai_event_loop():
+    """One event loop on a daemon thread shared by every bulk run, so the async model clients stay bound to it."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+        return _loop
+
+
+def parse_page_range(text, num_pages):
+    """'1-5, 8' to 0-based page numbers [0, 1, 2, 3, 4, 7], blank for the whole document."""
+    text = (text or "").strip()
+    if not text:
+        return list(range(num_pages))
+    pages = {}
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, dash, end = part.partition("-")
+        start = int(start)
+        end = int(end) if end.strip() else (num_pages if dash else start)
+        if start < 1 or end > num_pages or start > end:
+            raise ValueError(f"Page range {part} is outside 1-{num_pages}")
+        pages.update(dict.fromkeys(range(start - 1, end)))
+    return list(pages)
+
+
+class BulkNotesPipeline:
+    """Generates notes for many pages, render, text and model call per page, at most max_concurrency at once.
+
+    Every finished note is written to the notes store right away, which is the checkpoint:
+    pages that already have a note are skipped, so a run that was cancelled or crashed
+    picks up where it stopped. progress(done, total, page, html) is called from the event
+    loop thread after each page, with html None for a page that failed.
+    """
+
+    def __init__(self, doc, document_index, store, file_hash, generate, max_concurrency=4, zoom=1.0,
+                 max_retries=2, retry_delay=2.0, progress=None):
+        self.doc = doc
+        self.document_index = document_index
+        self.store = store
+        self.file_hash = file_hash
+        self.generate = generate
+        self.max_concurrency = max_concurrency
+        self.zoom = zoom
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.progress = progress
+
+    def run(self, pages, cancel_token=None, overwrite=False):
+        """Blocks until every page is done or the run is cancelled, returns the run's stats."""
+        return self.start(pages, cancel_token, overwrite).result()
+
+    def start(self, pages, cancel_token=None, overwrite=False):
+        """Starts the run on the shared event loop without blocking, returns a Future of the run's stats."""
+        return asyncio.run_coroutine_threadsafe(self._run(pages, cancel_token, overwrite), ai_event_loop())
+
+    async def _run(self, pages, cancel_token, overwrite):
+        start = time.perf_counter()
+        existing = set() if overwrite else self.store.pages(self.file_hash)
+        todo = [page for page in pages if page not in existing]
+        stats = {"pages": len(pages), "skipped": len(pages) - len(todo), "done": 0, "failed": {}, "cancelled": 0}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def note_page(page_number):
+            async with semaphore:
+                if is_cancelled(cancel_token):
+                    stats["cancelled"] += 1
+                    return
+                html = await self._note_page(page_number, stats)
+            if html is not None:
+                stats["done"] += 1
+            if self.progress:
+                self.progress(stats["done"] + len(stats["failed"]), len(todo), page_number, html)
+
+        await asyncio.gather(*(note_page(page_number) for page_number in todo))
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    async def _note_page(self, page_number, stats):
+        for attempt in range(self.max_retries + 1):
+            try:
+                image = await asyncio.to_thread(render_page, self.doc, page_number, self.zoom)
+                text = await asyncio.to_thread(self.document_index.page_text, page_number)
+                html = markdown.markdown(await self.generate(text, image))
+                self.store.put(self.file_hash, page_number, html)
+                return html
+            except Exception as e:
+                if attempt == self.max_retries:
+                    stats["failed"][page_number] = str(e)
+                    print(f"Notes error on page {page_number + 1}:", e)
+                    return None
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
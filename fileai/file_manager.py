@@ -2,9 +2,14 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import fitz  # PyMuPDF
 
+from fileai.text_index import DocumentIndex
+from fileai.search_index import SearchIndex
+
 class FileManager:
     def __init__(self, root):
         self.root = root
+        self.document_index = None
+        self.search_index = None
 
     def open_pdf_dialog(self):
         pdf_path = filedialog.askopenfilename(filetypes=[("PDF Files", "*.pdf")])
@@ -13,6 +18,13 @@ class FileManager:
     def load_pdf_document(self, pdf_path):
         try:
             doc = fitz.open(pdf_path)
+            # The previous document's extraction would only compete with the new one
+            if self.document_index is not None:
+                self.document_index.cancel()
+            self.document_index = DocumentIndex(doc, pdf_path)
+            self.search_index = SearchIndex()
+            self.document_index.listeners.append(self.search_index.add_page)
+            self.document_index.start()
             return doc
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open PDF:\n{e}")
@@ -0,0 +1,68 @@
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+from tkhtmlview import HTMLScrolledText
+
+
+class NoteWidgetCache:
+    """Sticky note widgets built once per note and reused across page changes.
+
+    Building a note parses its HTML into an HTMLScrolledText and measures it, which is
+    slow for long notes, so each built frame is kept with its measured height and only
+    re-parented onto the canvas when its page is shown again. A note whose HTML changed
+    is rebuilt. Past max_widgets the least recently shown widget is destroyed.
+    """
+
+    def __init__(self, canvas, max_widgets=12, width=400, max_height=700):
+        self.canvas = canvas
+        self.max_widgets = max_widgets
+        self.width = width
+        self.max_height = max_height
+        self.built = 0
+        self.reused = 0
+        self._widgets = OrderedDict()
+
+    def get(self, key, html, on_remove):
+        """Returns (frame, height) for the note, on_remove is called by its Remove Note button."""
+        entry = self._widgets.get(key)
+        if entry is not None and entry["html"] == html:
+            self._widgets.move_to_end(key)
+            self.reused += 1
+            return entry["frame"], entry["height"]
+        self.discard(key)
+        frame, height = self._build(html, on_remove)
+        self._widgets[key] = {"html": html, "frame": frame, "height": height}
+        self.built += 1
+        while len(self._widgets) > self.max_widgets:
+            _, evicted = self._widgets.popitem(last=False)
+            evicted["frame"].destroy()
+        return frame, height
+
+    def discard(self, key):
+        entry = self._widgets.pop(key, None)
+        if entry is not None:
+            entry["frame"].destroy()
+
+    def clear(self):
+        for entry in self._widgets.values():
+            entry["frame"].destroy()
+        self._widgets.clear()
+
+    def metrics(self):
+        return {"widgets": len(self._widgets), "built": self.built, "reused": self.reused}
+
+    def _build(self, html, on_remove):
+        frame = tk.Frame(self.canvas, bg="#F0F8FF", highlightthickness=1, highlightbackground="#888")
+        frame.pack_propagate(True)
+        top_bar = tk.Frame(frame, bg="#F0F8FF")
+        top_bar.pack(fill="x", side="top")
+        del_btn = ttk.Button(top_bar, text="Remove Note", command=on_remove)
+        del_btn.pack(side="right", padx=5, pady=5)
+        scroll_label = HTMLScrolledText(frame, html=html, background="#F0F8FF", padx=5, pady=5)
+        scroll_label.pack(fill="both", expand=True)
+        scroll_label.update_idletasks()
+        height = min(scroll_label.winfo_reqheight(), self.max_height)
+        frame.config(width=self.width, height=height)
+        frame.pack_propagate(False)
+        return frame, height
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+
+import fitz  # PyMuPDF
+from bs4 import BeautifulSoup
+
+from fileai.render_cache import fitz_lock
+
+NOTES_DB = os.path.join("cache", "notes.sqlite3")
+# Title of the annotations written by export_notes_to_pdf, how a later export finds and replaces them
+NOTE_ANNOT_TITLE = "AI notes"
+
+
+class NotesStore:
+    """Page notes of every opened document, kept in one SQLite file beside the app cache.
+
+    Notes are keyed by the document's content hash and page number, so they follow the
+    file across renames and moves, and each note is committed as soon as it is written.
+    """
+
+    def __init__(self, path=NOTES_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "file_hash TEXT NOT NULL, page INTEGER NOT NULL, html TEXT NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (file_hash, page))"
+            )
+
+    def get(self, file_hash, page):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT html FROM notes WHERE file_hash = ? AND page = ?", (file_hash, page)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, file_hash, page, html):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO notes (file_hash, page, html, updated) VALUES (?, ?, ?, ?)",
+                (file_hash, page, html, time.time()),
+            )
+
+    def delete(self, file_hash, page):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM notes WHERE file_hash = ? AND page = ?", (file_hash, page))
+
+    def pages(self, file_hash):
+        with self._lock:
+            rows = self._conn.execute("SELECT page FROM notes WHERE file_hash = ?", (file_hash,)).fetchall()
+        return {page for page, in rows}
+
+    def load(self, file_hash):
+        with self._lock:
+            rows = self._conn.execute("SELECT page, html FROM notes WHERE file_hash = ?", (file_hash,)).fetchall()
+        return dict(rows)
+
+
+def note_text(html):
+    return BeautifulSoup(html, "html.parser").get_text("\n").strip()
+
+
+def export_notes_to_pdf(pdf_path, notes, output_path):
+    """Writes a copy of pdf_path to output_path with each note as a native sticky note annotation.
+
+    notes maps page numbers to note HTML. Notes from an earlier export of the same file
+    are replaced rather than duplicated. Returns the number of notes written.
+    """
+    with fitz_lock:
+        doc = fitz.open(pdf_path)
+        try:
+            for page in doc:
+                old = [annot.xref for annot in page.annots() if annot.info.get("title") == NOTE_ANNOT_TITLE]
+                for xref in old:
+                    page.delete_annot(page.load_annot(xref))
+            for page_number, html in sorted(notes.items()):
+                page = doc[page_number]
+                annot = page.add_text_annot(page.rect.top_left + (12, 12), note_text(html), icon="Note")
+                annot.set_info(title=NOTE_ANNOT_TITLE)
+                annot.update()
+            doc.save(output_path, garbage=3, deflate=True)
+        finally:
+            doc.close()
+    return len(notes)
@@ -0,0 +1,34 @@
+import bisect
+
+
+class PageLayout:
+    """Vertical layout of every page of a document for continuous scrolling.
+
+    Only the geometry is kept per page, so the canvas can size its scroll region
+    and place pages without any of them being rendered.
+    """
+
+    def __init__(self, page_sizes, gap=10):
+        self.page_sizes = page_sizes
+        self.gap = gap
+        self.tops = []
+        y = gap
+        for _, height in page_sizes:
+            self.tops.append(y)
+            y += height + gap
+        self.height = y
+        self.width = max((width for width, _ in page_sizes), default=0)
+
+    def page_at(self, y):
+        if not self.tops:
+            return 0
+        return max(0, min(len(self.tops) - 1, bisect.bisect_right(self.tops, y) - 1))
+
+    def pages_between(self, y0, y1):
+        if not self.tops:
+            return range(0)
+        return range(self.page_at(y0), self.page_at(y1) + 1)
+
+    def page_left(self, page_number, canvas_width):
+        width = self.page_sizes[page_number][0]
+        return max(0, (max(self.width, canvas_width) - width) // 2)
@@ -1,15 +1,22 @@
 import tkinter as tk
-from tkinter import ttk
-from PIL import Image, ImageTk
-import io
-import fitz  # PyMuPDF
+from tkinter import ttk, simpledialog, messagebox, filedialog
+from PIL import ImageTk
 import random
 import markdown
-from tkhtmlview import HTMLScrolledText
 import threading
 import time
 import os
 
+from fileai.render_cache import PageRenderCache, fitz_lock
+from fileai.tile_renderer import TileRenderer
+from fileai.page_layout import PageLayout
+from fileai.ai_scheduler import ai_scheduler
+from customAgents.agent_llm.cancellation import CancellationToken
+from fileai.notes_store import NotesStore, export_notes_to_pdf
+from fileai.note_widgets import NoteWidgetCache
+from fileai.bulk_notes import BulkNotesPipeline, parse_page_range
+from RAG import DocumentRAG, chunk_boxes
+
 class PDFHandler:
     def __init__(self, parent, file_manager):
         self.parent = parent
@@ -24,7 +31,36 @@ class PDFHandler:
         self.selection_callback = None  # to be set by AIOverlay
         self.sel_start = None
         self.sel_rect = None
+        # Notes persist per document, keyed by the file's content hash. page_notes only holds the
+        # pages looked at so far, None for a page known to have no note
         self.page_notes = {}
+        self.notes_store = NotesStore()
+        self.file_hash = None
+        # A batch runs on the bulk notes event loop, outside the AI scheduler's workers
+        self.bulk_notes_future = None
+        self.bulk_notes_cancel = None
+        self.render_cache = PageRenderCache()
+        # Above this zoom only the tiles overlapping the viewport are rasterized
+        self.tile_renderer = TileRenderer(self.render_cache)
+        self.tiled_zoom = 2.5
+        self.tiled = False
+        self.tile_items = {}
+        self.view_update_id = None
+        # Pages and tiles are polled for every 30ms, until a round that makes no progress
+        # repeats max_poll_rounds times
+        self.max_poll_rounds = 300
+        self.poll_missing = None
+        self.poll_rounds = 0
+        self.page_size = (0, 0)
+        # Continuous scroll keeps images only for pages near the viewport
+        self.continuous = False
+        self.continuous_margin = 2
+        self.layout = None
+        self.page_items = {}
+        self.search_hits = []
+        self.search_hit_index = -1
+        self.document_rag = None
+        self.rag_highlights = []
         self.create_widgets()
 
     def create_widgets(self):
@@ -62,6 +98,31 @@ class PDFHandler:
         self.page_label = ttk.Label(self.toolbar, text="Page: 0/0")
         self.page_label.pack(side=tk.LEFT, padx=10)
 
+        self.continuous_var = tk.BooleanVar(value=False)
+        self.continuous_check = ttk.Checkbutton(
+            self.toolbar, text="Continuous scroll",
+            variable=self.continuous_var, command=self.toggle_continuous
+        )
+        self.continuous_check.pack(side=tk.LEFT, padx=10)
+
+        # Find in document
+        self.search_entry = ttk.Entry(self.toolbar, width=25)
+        self.search_entry.pack(side=tk.LEFT, padx=(10, 4))
+        self.search_entry.bind("<Return>", lambda event: self.run_search())
+        self.search_btn = ttk.Button(self.toolbar, text="Find", command=self.run_search)
+        self.search_btn.pack(side=tk.LEFT, padx=2)
+        self.prev_hit_btn = ttk.Button(self.toolbar, text="▲", width=3, command=lambda: self.goto_search_hit(-1))
+        self.prev_hit_btn.pack(side=tk.LEFT, padx=2)
+        self.next_hit_btn = ttk.Button(self.toolbar, text="▼", width=3, command=lambda: self.goto_search_hit(1))
+        self.next_hit_btn.pack(side=tk.LEFT, padx=2)
+        self.search_label = ttk.Label(self.toolbar, text="")
+        self.search_label.pack(side=tk.LEFT, padx=4)
+
+        self.export_notes_btn = ttk.Button(
+            self.toolbar, text="Export notes to PDF", command=self.export_notes, state=tk.DISABLED
+        )
+        self.export_notes_btn.pack(side=tk.LEFT, padx=(10, 4))
+
         # Canvas for PDF display
         self.canvas_frame = ttk.Frame(self.parent)
         self.canvas_frame.pack(fill=tk.BOTH, expand=True)
@@ -74,7 +135,10 @@ class PDFHandler:
         self.h_scroll = ttk.Scrollbar(self.parent, orient=tk.HORIZONTAL, command=self.page_canvas.xview)
         self.h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
 
-        self.page_canvas.configure(yscrollcommand=self.v_scroll.set, xscrollcommand=self.h_scroll.set)
+        self.note_widgets = NoteWidgetCache(self.page_canvas)
+
+        self.page_canvas.configure(yscrollcommand=self.on_canvas_yscroll, xscrollcommand=self.on_canvas_xscroll)
+        self.page_canvas.bind("<Configure>", lambda event: self.schedule_view_update())
 
         # Bind mouse events for selection and scrolling
         self.page_canvas.bind("<Button-1>", self.on_canvas_mouse_down)
@@ -83,6 +147,9 @@ class PDFHandler:
         self.parent.bind_all("<MouseWheel>", self.on_mouse_wheel)
         self.parent.bind_all("<Button-4>", self.on_mouse_wheel)
         self.parent.bind_all("<Button-5>", self.on_mouse_wheel)
+        self.parent.bind_all("<Control-plus>", lambda event: self.set_zoom(self.zoom * 1.25))
+        self.parent.bind_all("<Control-equal>", lambda event: self.set_zoom(self.zoom * 1.25))
+        self.parent.bind_all("<Control-minus>", lambda event: self.set_zoom(self.zoom / 1.25))
 
         # Sticky note button
         from helpers import load_icon
@@ -96,38 +163,93 @@ class PDFHandler:
         self.add_note_btn.image = note_icon
         self.add_note_btn.place(x=10, rely=1.0, anchor="sw", y=-10)
 
+        self.bulk_notes_btn = ttk.Button(
+            self.parent,
+            text="Take notes for pages...",
+            command=self.bulk_notes, state=tk.DISABLED
+        )
+        self.bulk_notes_btn.place(x=10, rely=1.0, anchor="sw", y=-60)
+        self.notes_progress_label = ttk.Label(self.parent, text="")
+        self.notes_progress_label.place(x=10, rely=1.0, anchor="sw", y=-95)
+
     def open_pdf(self):
         pdf_path = self.file_manager.open_pdf_dialog()
         if pdf_path:
+            if self.bulk_notes_cancel is not None:
+                self.bulk_notes_cancel.cancel()
+                self.bulk_notes_future = self.bulk_notes_cancel = None
             self.doc = self.file_manager.load_pdf_document(pdf_path)
             if self.doc:
                 self.num_pages = self.doc.page_count
                 self.current_page = 0
+                self.render_cache.set_document(self.doc)
+                self.tile_renderer.set_document(self.doc)
+                self.layout = None
+                self.search_hits = []
+                self.search_hit_index = -1
+                self.search_label.config(text="")
+                self.rag_highlights = []
+                # Notes are keyed by the file hash, computed on the indexing thread, so they
+                # stay off until it is known
+                self.file_hash = None
+                self.page_notes = {}
+                self.note_widgets.clear()
+                for button in (self.add_note_btn, self.bulk_notes_btn, self.export_notes_btn):
+                    button.config(state=tk.DISABLED)
+                self.bulk_notes_btn.config(text="Take notes for pages...")
+                self.notes_progress_label.config(text="")
+                self.wait_for_file_hash(self.file_manager.document_index)
+                if self.document_rag is not None:
+                    self.document_rag.cancel()
+                self.document_rag = DocumentRAG(pdf_path, document_index=self.file_manager.document_index)
+                self.document_rag.start()
                 self.update_navigation_buttons()
                 self.display_page(self.current_page)
-                self.add_note_btn.config(state=tk.NORMAL)
+
+    def wait_for_file_hash(self, document_index):
+        def wait():
+            document_index.hashed.wait()
+            self.parent.after(0, lambda: self.on_file_hashed(document_index))
+        threading.Thread(target=wait, daemon=True).start()
+
+    def on_file_hashed(self, document_index):
+        if document_index is not self.file_manager.document_index or document_index.file_hash is None:
+            return
+        self.file_hash = document_index.file_hash
+        for button in (self.add_note_btn, self.bulk_notes_btn, self.export_notes_btn):
+            button.config(state=tk.NORMAL)
+        self.show_sticky_note_for_page(self.current_page)
 
     def display_page(self, page_number, scroll_position="top"):
         if not self.doc or not (0 <= page_number < self.num_pages):
             return
-        page = self.doc.load_page(page_number)
-        mat = fitz.Matrix(self.zoom, self.zoom)
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("png")
-        from PIL import Image
-        pil_img = Image.open(io.BytesIO(img_data))
-        self.current_pil_image = pil_img
-        self.page_image_tk = ImageTk.PhotoImage(pil_img)
-        self.page_text = page.get_text("text")
+        if self.continuous:
+            self.scroll_to_page(page_number, scroll_position)
+            return
+        self.tiled = self.zoom >= self.tiled_zoom
+        self.page_text = self.file_manager.document_index.page_text(page_number)
+        with fitz_lock:
+            page_rect = self.doc.load_page(page_number).rect
+        if self.tiled:
+            self.current_pil_image = None
+            self.page_image_tk = None
+            img_width, img_height = int(page_rect.width * self.zoom), int(page_rect.height * self.zoom)
+        else:
+            pil_img = self.render_cache.get(page_number, self.zoom)
+            self.current_pil_image = pil_img
+            self.page_image_tk = ImageTk.PhotoImage(pil_img)
+            img_width, img_height = pil_img.size
+        self.page_size = (img_width, img_height)
 
         self.page_canvas.delete("all")
-        img_width, img_height = pil_img.size
+        self.tile_items = {}
         self.page_canvas.config(scrollregion=(0, 0, img_width, img_height))
         canvas_width = self.page_canvas.winfo_width() or img_width
         canvas_height = self.page_canvas.winfo_height() or img_height
         x_offset = (canvas_width - img_width) // 2 if canvas_width > img_width else 0
         y_offset = (canvas_height - img_height) // 2 if canvas_height > img_height else 0
-        self.page_canvas.create_image(x_offset, y_offset, anchor="nw", image=self.page_image_tk)
+        if not self.tiled:
+            self.page_canvas.create_image(x_offset, y_offset, anchor="nw", image=self.page_image_tk)
         self.img_offset = (x_offset, y_offset)
         if scroll_position == "top":
             self.page_canvas.yview_moveto(0)
@@ -135,6 +257,242 @@ class PDFHandler:
             self.page_canvas.yview_moveto(1)
         self.page_label.config(text=f"Page: {page_number+1}/{self.num_pages}")
         self.show_sticky_note_for_page(page_number)
+        self.draw_search_hits(page_number)
+        self.draw_rag_highlights(page_number)
+        if self.tiled:
+            self.update_visible_tiles()
+        else:
+            self.render_cache.prefetch(page_number, self.zoom)
+
+    def set_zoom(self, zoom):
+        zoom = max(0.5, min(zoom, 8.0))
+        if not self.doc or zoom == self.zoom:
+            return
+        self.zoom = zoom
+        self.tile_renderer.clear()
+        if self.continuous:
+            self.enter_continuous_mode()
+        self.display_page(self.current_page)
+
+    def toggle_continuous(self):
+        self.continuous = self.continuous_var.get()
+        if not self.doc:
+            return
+        if self.continuous:
+            self.enter_continuous_mode()
+        self.display_page(self.current_page)
+
+    def enter_continuous_mode(self):
+        self.tiled = False
+        self.tile_items = {}
+        self.page_items = {}
+        self.page_image_tk = None
+        with fitz_lock:
+            rects = [self.doc.load_page(i).rect for i in range(self.num_pages)]
+        self.layout = PageLayout([(int(r.width * self.zoom), int(r.height * self.zoom)) for r in rects])
+        self.page_canvas.delete("all")
+        canvas_width = self.page_canvas.winfo_width()
+        self.page_canvas.config(scrollregion=(0, 0, max(self.layout.width, canvas_width), self.layout.height))
+
+    def scroll_to_page(self, page_number, scroll_position="top"):
+        if self.layout is None:
+            self.enter_continuous_mode()
+        top = self.layout.tops[page_number] - self.layout.gap
+        if scroll_position == "bottom":
+            top += self.layout.page_sizes[page_number][1] + self.layout.gap - self.page_canvas.winfo_height()
+        self.page_canvas.yview_moveto(max(0, top) / self.layout.height)
+        self.set_continuous_page(page_number)
+        self.update_continuous_view()
+
+    def set_continuous_page(self, page_number):
+        self.current_page = page_number
+        self.page_text = self.file_manager.document_index.page_text(page_number)
+        self.current_pil_image = self.render_cache.peek(page_number, self.zoom)
+        self.page_size = self.layout.page_sizes[page_number]
+        self.img_offset = (self.layout.page_left(page_number, self.page_canvas.winfo_width()), self.layout.tops[page_number])
+        self.update_navigation_buttons()
+        self.show_sticky_note_for_page(page_number)
+        self.draw_search_hits(page_number)
+        self.draw_rag_highlights(page_number)
+
+    def on_canvas_yscroll(self, first, last):
+        self.v_scroll.set(first, last)
+        self.schedule_view_update()
+
+    def on_canvas_xscroll(self, first, last):
+        self.h_scroll.set(first, last)
+        self.schedule_view_update()
+
+    def schedule_view_update(self):
+        if (self.tiled or self.continuous) and self.view_update_id is None:
+            self.view_update_id = self.page_canvas.after_idle(self.update_view)
+
+    def update_view(self):
+        self.view_update_id = None
+        if self.continuous:
+            self.update_continuous_view()
+        else:
+            self.update_visible_tiles()
+
+    def update_continuous_view(self):
+        if not self.continuous or not self.doc or self.layout is None:
+            return
+        y0 = self.page_canvas.canvasy(0)
+        y1 = y0 + self.page_canvas.winfo_height()
+        visible = self.layout.pages_between(y0, y1)
+        wanted = range(max(0, visible.start - self.continuous_margin), min(self.num_pages, visible.stop + self.continuous_margin))
+        # Pages that left the window go back to nothing, not even a placeholder
+        for page_number in list(self.page_items):
+            if page_number not in wanted:
+                item_id, _ = self.page_items.pop(page_number)
+                self.page_canvas.delete(item_id)
+        canvas_width = self.page_canvas.winfo_width()
+        missing = []
+        for page_number in wanted:
+            item = self.page_items.get(page_number)
+            if item is not None and item[1] is not None:
+                continue
+            x = self.layout.page_left(page_number, canvas_width)
+            top = self.layout.tops[page_number]
+            pil_img = self.render_cache.take(page_number, self.zoom)
+            if pil_img is None:
+                if item is None:
+                    width, height = self.layout.page_sizes[page_number]
+                    item_id = self.page_canvas.create_rectangle(x, top, x + width, top + height, fill="#EEEEEE", outline="#CCCCCC", tags="page")
+                    self.page_canvas.tag_lower(item_id)
+                    self.page_items[page_number] = (item_id, None)
+                # A page that failed to render keeps its placeholder
+                if (page_number, self.zoom) not in self.render_cache.failed:
+                    missing.append(page_number)
+                continue
+            if item is not None:
+                self.page_canvas.delete(item[0])
+            page_tk = ImageTk.PhotoImage(pil_img)
+            item_id = self.page_canvas.create_image(x, top, anchor="nw", image=page_tk, tags="page")
+            self.page_canvas.tag_lower(item_id)
+            self.page_items[page_number] = (item_id, page_tk)
+        center = self.layout.page_at((y0 + y1) / 2)
+        if center != self.current_page:
+            self.set_continuous_page(center)
+        if missing:
+            # Pages are rendered by the cache worker and handed over even when they don't fit its budget
+            self.render_cache.request(sorted(missing, key=lambda p: abs(p - center)), self.zoom, hand_off=True)
+        self.poll_for_renders(("pages", self.zoom, tuple(missing)))
+
+    def poll_for_renders(self, missing):
+        # Polls until what is missing lands, giving up when it stops changing for max_poll_rounds
+        if missing != self.poll_missing:
+            self.poll_missing = missing
+            self.poll_rounds = 0
+        if missing[-1] and self.poll_rounds < self.max_poll_rounds:
+            self.poll_rounds += 1
+            self.page_canvas.after(30, self.schedule_view_update)
+
+    def update_visible_tiles(self):
+        if not self.tiled or not self.doc:
+            return
+        ox, oy = self.img_offset
+        x0 = self.page_canvas.canvasx(0) - ox
+        y0 = self.page_canvas.canvasy(0) - oy
+        viewport = (x0, y0, x0 + self.page_canvas.winfo_width(), y0 + self.page_canvas.winfo_height())
+        visible = set(self.tile_renderer.visible_tiles(self.page_size, viewport))
+        # Tiles that scrolled out of view give their Tk images back
+        for tile in list(self.tile_items):
+            if tile not in visible:
+                item_id, _ = self.tile_items.pop(tile)
+                self.page_canvas.delete(item_id)
+        ts = self.tile_renderer.tile_size
+        page_width, page_height = self.page_size
+        missing = []
+        for col, row in sorted(visible):
+            item = self.tile_items.get((col, row))
+            if item is not None and item[1] is not None:
+                continue
+            x, y = ox + col * ts, oy + row * ts
+            tile_img = self.tile_renderer.peek_tile(self.current_page, self.zoom, col, row)
+            if tile_img is None:
+                if item is None:
+                    item_id = self.page_canvas.create_rectangle(
+                        x, y, ox + min(page_width, (col + 1) * ts), oy + min(page_height, (row + 1) * ts),
+                        fill="#EEEEEE", outline="", tags="tile"
+                    )
+                    self.page_canvas.tag_lower(item_id)
+                    self.tile_items[(col, row)] = (item_id, None)
+                # A tile that failed to render keeps its placeholder
+                if (self.current_page, self.zoom, col, row) not in self.tile_renderer.failed:
+                    missing.append((col, row))
+                continue
+            if item is not None:
+                self.page_canvas.delete(item[0])
+            tile_tk = ImageTk.PhotoImage(tile_img)
+            item_id = self.page_canvas.create_image(x, y, anchor="nw", image=tile_tk, tags="tile")
+            self.page_canvas.tag_lower(item_id)
+            self.tile_items[(col, row)] = (item_id, tile_tk)
+        if missing:
+            # Tiles are rendered by the cache worker, poll until they land
+            self.tile_renderer.request(self.current_page, self.zoom, missing)
+        self.poll_for_renders(("tiles", self.current_page, self.zoom, tuple(missing)))
+
+    def run_search(self):
+        search_index = self.file_manager.search_index
+        query = self.search_entry.get().strip()
+        if not self.doc or search_index is None or not query:
+            return
+        self.search_hits = search_index.search(query)
+        self.search_hit_index = -1
+        if not self.search_hits:
+            self.search_label.config(text="No results")
+            self.draw_search_hits(self.current_page)
+            return
+        # Start from the first hit at or after the current page
+        later = [i for i, hit in enumerate(self.search_hits) if hit[0] >= self.current_page]
+        self.search_hit_index = (later[0] if later else 0) - 1
+        self.goto_search_hit(1)
+
+    def goto_search_hit(self, step):
+        if not self.search_hits:
+            return
+        self.search_hit_index = (self.search_hit_index + step) % len(self.search_hits)
+        page_number = self.search_hits[self.search_hit_index][0]
+        indexed = self.file_manager.search_index.pages_indexed
+        more = "+" if indexed < self.num_pages else ""
+        self.search_label.config(text=f"{self.search_hit_index + 1}/{len(self.search_hits)}{more}")
+        if page_number != self.current_page:
+            self.current_page = page_number
+            self.display_page(page_number)
+            self.update_navigation_buttons()
+        else:
+            self.draw_search_hits(page_number)
+
+    def draw_search_hits(self, page_number):
+        self.page_canvas.delete("search_hit")
+        if not self.search_hits:
+            return
+        ox, oy = self.img_offset
+        for i, hit in enumerate(self.search_hits):
+            if hit[0] != page_number:
+                continue
+            color = "#FF6F00" if i == self.search_hit_index else "#FFD54F"
+            for x0, y0, x1, y1 in self.file_manager.search_index.hit_boxes(hit):
+                self.page_canvas.create_rectangle(
+                    ox + x0 * self.zoom, oy + y0 * self.zoom, ox + x1 * self.zoom, oy + y1 * self.zoom,
+                    outline=color, width=2, tags="search_hit"
+                )
+
+    def highlight_chunks(self, docs):
+        # Outlines the passages a document chat answer was based on
+        self.rag_highlights = [(doc.metadata.get("page", 0), box) for doc in docs for box in chunk_boxes(doc)]
+        self.draw_rag_highlights(self.current_page)
+
+    def draw_rag_highlights(self, page_number):
+        self.page_canvas.delete("rag_highlight")
+        ox, oy = self.img_offset
+        for page, (x0, y0, x1, y1) in self.rag_highlights:
+            if page == page_number:
+                self.page_canvas.create_rectangle(
+                    ox + x0 * self.zoom, oy + y0 * self.zoom, ox + x1 * self.zoom, oy + y1 * self.zoom,
+                    outline="#42A5F5", width=2, dash=(4, 2), tags="rag_highlight"
+                )
 
     def change_page(self, direction):
         if direction == "next" and self.current_page < self.num_pages - 1:
@@ -162,6 +520,9 @@ class PDFHandler:
             delta = -1 if event.num == 4 else 1 if event.num == 5 else 0
         else:
             delta = -int(event.delta / 120)
+        if self.continuous:
+            self.page_canvas.yview_scroll(delta, "units")
+            return "break"
         first, last = self.page_canvas.yview()
         if delta > 0 and last >= 0.999 and self.current_page < self.num_pages - 1:
             self.change_page("next")
@@ -220,66 +581,164 @@ class PDFHandler:
         return self.page_canvas.create_polygon(points, smooth=True, **kwargs)
 
     def get_cropped_region(self, x0, y0, x1, y1):
-        if not self.current_pil_image:
+        if self.continuous and self.layout is not None:
+            page_number = self.layout.page_at(y0)
+            if page_number != self.current_page:
+                self.set_continuous_page(page_number)
+            if self.current_pil_image is None:
+                self.current_pil_image = self.render_cache.get(page_number, self.zoom)
+        if not self.current_pil_image and not self.tiled:
             return None
         ox, oy = self.img_offset
-        crop_left = max(0, min(self.current_pil_image.width, x0 - ox))
-        crop_top = max(0, min(self.current_pil_image.height, y0 - oy))
-        crop_right = max(0, min(self.current_pil_image.width, x1 - ox))
-        crop_bottom = max(0, min(self.current_pil_image.height, y1 - oy))
+        page_width, page_height = self.page_size
+        crop_left = max(0, min(page_width, x0 - ox))
+        crop_top = max(0, min(page_height, y0 - oy))
+        crop_right = max(0, min(page_width, x1 - ox))
+        crop_bottom = max(0, min(page_height, y1 - oy))
         if crop_right <= crop_left or crop_bottom <= crop_top:
             return None
+        if self.tiled:
+            return self.tile_renderer.render_region(self.current_page, self.zoom, (crop_left, crop_top, crop_right, crop_bottom))
         return self.current_pil_image.crop((crop_left, crop_top, crop_right, crop_bottom))
 
     def add_sticky_note(self):
         # Immediately show a placeholder note
         self.page_notes[self.current_page] = "<p><em>Generating note...</em></p>"
         self.show_sticky_note_for_page(self.current_page)
+        page_image = self.current_pil_image or self.render_cache.get(self.current_page, 1.0)
+        page_number, page_text, file_hash = self.current_page, self.page_text, self.file_hash
         # In background, generate note using AI
-        def threaded_note():
+        def generate_note(task):
             from call_ai import notes_ai
-            md_text = notes_ai(self.page_text, self.current_pil_image)
+            md_text = notes_ai(page_text, page_image)
             html_text = markdown.markdown(md_text)
-            self.page_notes[self.current_page] = html_text
-            self.parent.after(0, lambda: self.show_sticky_note_for_page(self.current_page))
-        threading.Thread(target=threaded_note, daemon=True).start()
+            self.notes_store.put(file_hash, page_number, html_text)
+            if file_hash == self.file_hash:
+                self.page_notes[page_number] = html_text
+                self.parent.after(0, lambda: self.show_sticky_note_for_page(self.current_page))
+        ai_scheduler.submit("note", generate_note, key=("note", file_hash, page_number))
 
-    def show_sticky_note_for_page(self, page_number):
-        # Remove any existing note
-        existing = self.page_canvas.find_withtag("sticky_note")
-        for item in existing:
-            self.page_canvas.delete(item)
+    def bulk_notes(self):
+        # The same button stops a running batch, finished pages stay in the store and are skipped next time
+        if self.bulk_notes_future is not None and not self.bulk_notes_future.done():
+            self.bulk_notes_cancel.cancel()
+            self.notes_progress_label.config(text="Stopping notes...")
+            return
+        pages_text = simpledialog.askstring(
+            "Take notes for pages",
+            f"Pages to take notes for, e.g. 1-10, 15 (leave blank for all {self.num_pages}):",
+            parent=self.parent
+        )
+        if pages_text is None:
+            return
+        try:
+            pages = parse_page_range(pages_text, self.num_pages)
+        except ValueError as e:
+            messagebox.showerror("Notes", str(e))
+            return
+        from call_ai import anotes_ai
+        file_hash = self.file_hash
+
+        def progress(done, total, page_number, html):
+            self.parent.after(0, lambda: self.on_bulk_notes_progress(file_hash, done, total, page_number, html))
+
+        pipeline = BulkNotesPipeline(
+            self.doc, self.file_manager.document_index, self.notes_store, file_hash,
+            generate=anotes_ai, progress=progress
+        )
+
+        def done(future):
+            stats = None
+            try:
+                stats = future.result()
+            except Exception as e:
+                print("Bulk notes error:", e)
+            self.parent.after(0, lambda: self.on_bulk_notes_done(file_hash, stats))
+
+        # The batch holds no scheduler worker for its whole run, chat and popups keep all of them
+        self.bulk_notes_cancel = CancellationToken()
+        self.bulk_notes_future = pipeline.start(pages, cancel_token=self.bulk_notes_cancel)
+        self.bulk_notes_future.add_done_callback(done)
+        self.bulk_notes_btn.config(text="Stop taking notes")
+        self.notes_progress_label.config(text="Taking notes...")
+
+    def on_bulk_notes_progress(self, file_hash, done, total, page_number, html):
+        if file_hash != self.file_hash:
+            return
+        if html is not None:
+            self.page_notes[page_number] = html
+            if page_number == self.current_page:
+                self.show_sticky_note_for_page(page_number)
+        self.notes_progress_label.config(text=f"Notes {done}/{total}")
+
+    def on_bulk_notes_done(self, file_hash, stats):
+        if file_hash != self.file_hash:
+            return
+        self.bulk_notes_btn.config(text="Take notes for pages...")
+        if stats is None:
+            self.notes_progress_label.config(text="Notes failed")
+            return
+        summary = f"Notes: {stats['done']} new, {stats['skipped']} already taken"
+        if stats["failed"]:
+            summary += f", {len(stats['failed'])} failed"
+        if stats["cancelled"]:
+            summary += f", {stats['cancelled']} stopped"
+        self.notes_progress_label.config(text=summary)
+
+    def note_for_page(self, page_number):
+        # Read from the store the first time a page is shown
+        if self.file_hash is None:
+            return self.page_notes.get(page_number)
         if page_number not in self.page_notes:
+            self.page_notes[page_number] = self.notes_store.get(self.file_hash, page_number)
+        return self.page_notes[page_number]
+
+    def export_notes(self):
+        notes = self.notes_store.load(self.file_hash)
+        if not notes:
+            messagebox.showinfo("Export notes", "This document has no notes yet.")
+            return
+        pdf_path = self.file_manager.document_index.pdf_path
+        output_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            initialfile=os.path.splitext(os.path.basename(pdf_path))[0] + "_notes.pdf",
+            filetypes=[("PDF Files", "*.pdf")]
+        )
+        if not output_path:
+            return
+        if os.path.abspath(output_path) == os.path.abspath(pdf_path):
+            messagebox.showerror("Export notes", "Choose a new file, the open document can't be overwritten.")
             return
-        html_text = self.page_notes[page_number]
-        note_width = 400
-        max_note_height = 700
-        if self.current_pil_image:
-            pdf_width, pdf_height = self.current_pil_image.width, self.current_pil_image.height
-            x_left = 15
+
+        def run_export():
+            try:
+                count = export_notes_to_pdf(pdf_path, notes, output_path)
+                self.parent.after(0, lambda: messagebox.showinfo("Export notes", f"Wrote {count} notes to {output_path}"))
+            except Exception as e:
+                self.parent.after(0, lambda: messagebox.showerror("Export notes", f"Failed to export notes:\n{e}"))
+
+        threading.Thread(target=run_export, daemon=True).start()
+
+    def show_sticky_note_for_page(self, page_number):
+        # Take any shown note off the canvas, its widget stays cached for when its page comes back
+        self.page_canvas.delete("sticky_note")
+        html_text = self.note_for_page(page_number)
+        if html_text is None:
+            return
+        key = (self.file_hash, page_number)
+
+        def delete_current_note():
+            self.page_notes[page_number] = None
+            self.notes_store.delete(self.file_hash, page_number)
+            self.page_canvas.delete("sticky_note")
+            self.note_widgets.discard(key)
+
+        note_frame, note_height = self.note_widgets.get(key, html_text, delete_current_note)
+        if self.doc:
+            pdf_width, pdf_height = self.page_size
             y_center = self.img_offset[1] + (pdf_height // 2)
         else:
-            x_left = 15
             y_center = 100
-        note_frame = tk.Frame(self.page_canvas, bg="#F0F8FF", highlightthickness=1, highlightbackground="#888")
-        note_frame.pack_propagate(True)
-        top_bar = tk.Frame(note_frame, bg="#F0F8FF")
-        top_bar.pack(fill="x", side="top")
-        def delete_current_note():
-            if page_number in self.page_notes:
-                del self.page_notes[page_number]
-            self.page_canvas.delete(window_id)
-        from tkinter import ttk
-        del_btn = ttk.Button(top_bar, text="Remove Note", command=delete_current_note)
-        del_btn.pack(side="right", padx=5, pady=5)
-        scroll_label = HTMLScrolledText(note_frame, html=html_text, background="#F0F8FF", padx=5, pady=5)
-        scroll_label.pack(fill="both", expand=True)
-        window_id = self.page_canvas.create_window(x_left, y_center, anchor="center", window=note_frame, tags="sticky_note")
-        scroll_label.update_idletasks()
-        required_height = scroll_label.winfo_reqheight()
-        final_height = min(required_height, max_note_height)
-        note_frame.config(width=note_width, height=final_height)
-        note_frame.pack_propagate(False)
-        final_y = y_center - (final_height // 2)
-        self.page_canvas.coords(window_id, x_left, final_y)
-        self.page_canvas.itemconfig(window_id, anchor="nw")
+        self.page_canvas.create_window(
+            15, y_center - (note_height // 2), anchor="nw", window=note_frame, tags="sticky_note"
+        )
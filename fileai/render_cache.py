@@ -0,0 +1,216 @@
+import io
+import threading
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# PyMuPDF documents are not thread-safe, every call into fitz from a worker
+# thread (or from the UI thread while workers are alive) goes through this lock.
+fitz_lock = threading.RLock()
+
+
+def image_nbytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+def pixmap_to_image(pix):
+    # Build the PIL image straight from the pixmap samples instead of a PNG
+    # encode/decode round trip: no deflate, and a single copy of the pixels.
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride)
+
+
+def render_page(doc, page_number, zoom):
+    with fitz_lock:
+        page = doc.load_page(page_number)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        return pixmap_to_image(pix)
+
+
+class PageRenderCache:
+    """LRU cache of rendered pages keyed by (page, zoom), bounded by a byte budget.
+
+    A daemon worker pre-renders the pages around the last displayed one so that
+    turning the page is served from memory instead of rasterizing on the Tk thread.
+    Other renderers hand the same worker jobs through run_jobs, which go first.
+
+    Pages requested for the view are handed over through take even when they are
+    larger than the budget or evicted before the view picks them up, and pages that
+    failed to render are remembered in failed so they are not requested again.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, prefetch_pages=2):
+        self.max_bytes = max_bytes
+        self.prefetch_pages = prefetch_pages
+        self.doc = None
+        self.num_pages = 0
+        self.bytes_used = 0
+        self._images = OrderedDict()
+        self._pending = []
+        self._jobs = []
+        self._handoff = {}
+        self._wanted = set()
+        self.failed = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = threading.Thread(target=self._prefetch_loop, daemon=True)
+        self._worker.start()
+
+    def set_document(self, doc):
+        with self._lock:
+            self.doc = doc
+            self.num_pages = doc.page_count if doc else 0
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
+            self._images.clear()
+            self._handoff.clear()
+            self._wanted = set()
+            self.failed = set()
+            self.bytes_used = 0
+
+    def get(self, page_number, zoom):
+        key = (page_number, zoom)
+        with self._lock:
+            pil_img = self._images.get(key)
+            if pil_img is not None:
+                self._images.move_to_end(key)
+                return pil_img
+            doc = self.doc
+        pil_img = render_page(doc, page_number, zoom)
+        self._store(doc, key, pil_img)
+        return pil_img
+
+    def peek(self, page_number, zoom):
+        key = (page_number, zoom)
+        with self._lock:
+            pil_img = self._images.get(key)
+            if pil_img is not None:
+                self._images.move_to_end(key)
+            return pil_img
+
+    def take(self, page_number, zoom):
+        """Like peek, but also returns a page requested with hand_off that didn't stay cached."""
+        key = (page_number, zoom)
+        with self._lock:
+            pil_img = self._handoff.pop(key, None)
+        return pil_img if pil_img is not None else self.peek(page_number, zoom)
+
+    def prefetch(self, page_number, zoom):
+        neighbours = []
+        for step in range(1, self.prefetch_pages + 1):
+            neighbours += [page_number + step, page_number - step]
+        self.request(neighbours, zoom)
+
+    def request(self, page_numbers, zoom, hand_off=False):
+        """Renders page_numbers on the worker. With hand_off they are kept for take until picked up."""
+        with self._lock:
+            if self.doc is None:
+                return
+            # Newer requests replace older ones, the user has moved on.
+            self._pending = [
+                (page_number, zoom) for page_number in page_numbers
+                if 0 <= page_number < self.num_pages and (page_number, zoom) not in self._images
+                and (page_number, zoom) not in self._handoff and (page_number, zoom) not in self.failed
+            ]
+            # Handed-off pages the view no longer wants are dropped
+            self._wanted = {(page_number, zoom) for page_number in page_numbers} if hand_off else set()
+            for key in [key for key in self._handoff if key not in self._wanted]:
+                del self._handoff[key]
+            self._wakeup.notify()
+
+    def run_jobs(self, jobs):
+        """Runs the callables in jobs on the worker, replacing any jobs not started yet."""
+        with self._lock:
+            self._jobs = list(jobs)
+            self._wakeup.notify()
+
+    def _prefetch_loop(self):
+        while True:
+            with self._wakeup:
+                while not self._pending and not self._jobs:
+                    self._wakeup.wait()
+                if self._jobs:
+                    job = self._jobs.pop(0)
+                else:
+                    job = None
+                    key = self._pending.pop(0)
+                    doc = self.doc
+                    if key in self._images or key in self._handoff:
+                        continue
+            if job is not None:
+                try:
+                    job()
+                except Exception as e:
+                    print("Render job error:", e)
+                continue
+            try:
+                pil_img = render_page(doc, *key)
+            except Exception as e:
+                print("Prefetch error:", e)
+                with self._lock:
+                    if doc is self.doc:
+                        self.failed.add(key)
+                continue
+            self._store(doc, key, pil_img)
+
+    def _store(self, doc, key, pil_img):
+        size = image_nbytes(pil_img)
+        with self._lock:
+            if doc is not self.doc:
+                return
+            if key in self._wanted:
+                self._handoff[key] = pil_img
+            if key in self._images or size > self.max_bytes:
+                return
+            self._images[key] = pil_img
+            self.bytes_used += size
+            while self.bytes_used > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self.bytes_used -= image_nbytes(evicted)
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m fileai.render_cache file.pdf [pages]
+    # Pixmaps and PIL buffers are allocated outside the Python heap, so each path runs in its
+    # own process and peak memory is the growth of its max RSS over the loaded document.
+    import resource
+    import subprocess
+    import sys
+    import time
+
+    def render_png(doc, page_number, zoom):
+        pix = doc.load_page(page_number).get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        pil_img = Image.open(io.BytesIO(pix.tobytes("png")))
+        pil_img.load()
+        return pil_img
+
+    def max_rss():
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+    renders = {"png round trip": render_png, "raw samples": render_page}
+    if sys.argv[1] == "--child":
+        pdf_path, pages, zoom, name = sys.argv[2], int(sys.argv[3]), float(sys.argv[4]), sys.argv[5]
+        doc = fitz.open(pdf_path)
+        doc.load_page(0)
+        baseline = max_rss()
+        start = time.perf_counter()
+        for page_number in range(pages):
+            renders[name](doc, page_number, zoom)
+        elapsed = (time.perf_counter() - start) / pages
+        print(f"{elapsed * 1000:.1f} {(max_rss() - baseline) / 1024 / 1024:.1f}")
+        sys.exit()
+
+    with fitz.open(sys.argv[1]) as doc:
+        pages = min(int(sys.argv[2]) if len(sys.argv) > 2 else 20, doc.page_count)
+    for zoom in (1.5, 3.0):
+        for name in renders:
+            output = subprocess.run(
+                [sys.executable, "-m", "fileai.render_cache", "--child", sys.argv[1], str(pages), str(zoom), name],
+                capture_output=True, text=True, check=True,
+            ).stdout.split()[-2:]
+            print(f"zoom {zoom}: {name:<15} {float(output[0]):8.1f} ms/page  peak +{float(output[1]):7.1f} MiB RSS")
@@ -0,0 +1,216 @@
+import bisect
+import heapq
+import itertools
+import re
+import threading
+
+import numpy as np
+
+_strip_re = re.compile(r"^\W+|\W+$")
+
+# Postings are single ints, page << POSITION_BITS | position, so they sort in document order
+POSITION_BITS = 20
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+
+def normalize(word):
+    return _strip_re.sub("", word.lower())
+
+
+class SearchIndex:
+    """Inverted index over the words of a document, filled page by page.
+
+    Postings map a term to word positions, which index into the page's word list
+    from DocumentIndex, so every hit maps straight back to word boxes. A query is
+    a phrase of one or more terms; a term ending in "*" is a prefix.
+
+    Phrases intersect the sorted position arrays of their exact terms with numpy
+    and check any prefix terms in place on the few positions left. A prefix-only
+    query walks the expansion that is cheapest for its size: merging a few terms'
+    postings, scanning pages when matches are dense, or sorting them when sparse.
+    Prefix sizes come from running posting counts over the sorted terms, so they
+    cost two lookups however many terms a prefix expands to.
+    """
+
+    # Prefix expansions up to this many terms are merged lazily
+    merge_terms = 64
+
+    def __init__(self):
+        self.postings = {}
+        self.terms = []
+        self.page_terms = {}
+        self.page_boxes = {}
+        self.words = 0
+        self._arrays = {}
+        self._cumulative = None
+        self._lock = threading.Lock()
+
+    @property
+    def pages_indexed(self):
+        return len(self.page_terms)
+
+    def add_page(self, page_number, entry):
+        terms = [normalize(word[4]) for word in entry["words"]]
+        base = page_number << POSITION_BITS
+        with self._lock:
+            if page_number in self.page_terms:
+                return
+            self.page_terms[page_number] = terms
+            self.page_boxes[page_number] = [word[:4] for word in entry["words"]]
+            for position, term in enumerate(terms):
+                if not term:
+                    continue
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = []
+                    bisect.insort(self.terms, term)
+                postings.append(base | position)
+            self.words += len(terms)
+
+    def search(self, query, limit=1000):
+        """
+        Returns up to limit hits as (page, position, length), in document order.
+        """
+        tokens = [token for token in query.split() if normalize(token)]
+        if not tokens:
+            return []
+        prefixes = [token.endswith("*") for token in tokens]
+        phrase = [normalize(token) for token in tokens]
+        with self._lock:
+            if all(prefixes):
+                starts = self._prefix_phrase(phrase, limit)
+            else:
+                starts = self._exact_phrase(phrase, prefixes, limit)
+        return [(start >> POSITION_BITS, start & POSITION_MASK, len(phrase)) for start in starts]
+
+    def hit_boxes(self, hit):
+        page_number, start, length = hit
+        return self.page_boxes[page_number][start:start + length]
+
+    def _exact_phrase(self, phrase, prefixes, limit):
+        # Intersect phrase start positions of the exact terms, rarest first
+        exact = sorted(
+            (i for i, prefix in enumerate(prefixes) if not prefix),
+            key=lambda i: len(self.postings.get(phrase[i], ())),
+        )
+        starts = None
+        for i in exact:
+            positions = self._array(phrase[i])
+            if positions is None:
+                return []
+            if starts is None:
+                # A phrase can't start before the beginning of its page
+                starts = positions[(positions & POSITION_MASK) >= i] - i if i else positions
+                continue
+            positions = positions - i
+            found = np.searchsorted(positions, starts)
+            found[found == len(positions)] = 0
+            starts = starts[positions[found] == starts]
+            if not len(starts):
+                return []
+        if not any(prefixes):
+            return starts[:limit].tolist()
+        # The exact terms already match, only the prefix terms are left to check
+        checks = [(i, term) for i, (term, prefix) in enumerate(zip(phrase, prefixes)) if prefix]
+        hits = []
+        for start in starts.tolist():
+            terms = self.page_terms[start >> POSITION_BITS]
+            position = start & POSITION_MASK
+            if position + len(phrase) <= len(terms) and all(terms[position + i].startswith(term) for i, term in checks):
+                hits.append(start)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def _prefix_phrase(self, phrase, limit):
+        ranges = [self._prefix_range(term) for term in phrase]
+        sizes = [self._count(lo, hi) for lo, hi in ranges]
+        anchor = sizes.index(min(sizes))
+        hits = []
+        for position in self._prefix_candidates(phrase[anchor], *ranges[anchor], sizes[anchor], limit):
+            if (position & POSITION_MASK) < anchor:
+                continue
+            start = position - anchor
+            if len(phrase) > 1:
+                terms = self.page_terms[start >> POSITION_BITS][start & POSITION_MASK:(start & POSITION_MASK) + len(phrase)]
+                if len(terms) < len(phrase) or not all(found.startswith(term) for found, term in zip(terms, phrase)):
+                    continue
+            hits.append(start)
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def _array(self, term):
+        # Sorted numpy copy of a term's postings, rebuilt when pages were added since
+        postings = self.postings.get(term)
+        if postings is None:
+            return None
+        cached = self._arrays.get(term)
+        if cached is None or len(cached) != len(postings):
+            cached = self._arrays[term] = np.array(postings, dtype=np.int64)
+        return cached
+
+    def _prefix_range(self, term):
+        lo = bisect.bisect_left(self.terms, term)
+        return lo, bisect.bisect_left(self.terms, term + "\U0010ffff", lo)
+
+    def _count(self, lo, hi):
+        # Postings of self.terms[lo:hi], from running counts rebuilt once per added page
+        if self._cumulative is None or self._cumulative[1] != self.words:
+            counts = np.fromiter((len(self.postings[term]) for term in self.terms), dtype=np.int64, count=len(self.terms))
+            self._cumulative = (np.concatenate(([0], np.cumsum(counts))), self.words)
+        cumulative = self._cumulative[0]
+        return int(cumulative[hi] - cumulative[lo])
+
+    def _prefix_candidates(self, term, lo, hi, size, limit):
+        if hi - lo <= self.merge_terms:
+            # Postings are appended in page order, merging keeps document order lazily
+            return heapq.merge(*(self.postings[found] for found in self.terms[lo:hi]))
+        # Scanning reads about limit * words / size words, sorting touches size postings
+        if size * size > limit * self.words:
+            return self._scan_pages(term)
+        positions = np.fromiter(
+            itertools.chain.from_iterable(self.postings[found] for found in self.terms[lo:hi]), dtype=np.int64
+        )
+        positions.sort()
+        return positions.tolist()
+
+    def _scan_pages(self, term):
+        for page_number in sorted(self.page_terms):
+            base = page_number << POSITION_BITS
+            for position, found in enumerate(self.page_terms[page_number]):
+                if found.startswith(term):
+                    yield base | position
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    # Synthetic 2000-page, 1M-word corpus with Zipf-distributed terms "term1", "term2", ...
+    rng = np.random.default_rng(0)
+    pages, words_per_page, vocabulary = 2000, 500, 100_000
+    ranks = np.minimum(rng.zipf(1.1, pages * words_per_page), vocabulary)
+    index = SearchIndex()
+    start = time.perf_counter()
+    for page_number in range(pages):
+        page_ranks = ranks[page_number * words_per_page:(page_number + 1) * words_per_page]
+        index.add_page(page_number, {"words": [[0, 0, 0, 0, f"term{rank}", 0, 0] for rank in page_ranks]})
+    print(f"indexed {index.words} words, {len(index.terms)} terms in {time.perf_counter() - start:.1f}s")
+
+    rare = random.Random(0).choice([term for term, postings in index.postings.items() if len(postings) == 1])
+    queries = [
+        "te*", "term1*", "term12*", "term123*", "term1", "term1 term2", "term1 term2 term3", "term4 term5 term6",
+        "term2 term1*", "term1* term2*", rare,
+    ]
+    for query in queries:
+        timings = []
+        for _ in range(20):
+            start = time.perf_counter()
+            hits = index.search(query)
+            timings.append(time.perf_counter() - start)
+        # The first run of a term also builds its cached arrays
+        cold = timings[0]
+        timings.sort()
+        print(f"{query:<20} {len(hits):>5} hits  median {timings[len(timings) // 2] * 1000:6.2f}ms  "
+              f"first {cold * 1000:6.2f}ms")
@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from fileai.render_cache import fitz_lock
+
+INDEX_DIR = os.path.join("cache", "text_index")
+INDEX_VERSION = 1
+
+
+def file_hash(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_page(page):
+    # Coordinates are rounded to 0.1pt, enough for highlighting and much smaller on disk
+    words = [
+        [round(x0, 1), round(y0, 1), round(x1, 1), round(y1, 1), word, block_no, line_no]
+        for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words")
+    ]
+    blocks = [
+        [round(x0, 1), round(y0, 1), round(x1, 1), round(y1, 1), text, block_type]
+        for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks")
+    ]
+    return {"text": page.get_text("text"), "words": words, "blocks": blocks}
+
+
+class DocumentIndex:
+    """Text, word boxes and block structure of every page, extracted once per file.
+
+    Extraction runs on a daemon thread when the document is opened and the result
+    is saved under INDEX_DIR keyed by the file's content hash, so reopening the same
+    file in a later session loads the index instead of re-extracting it. cancel stops
+    the extraction of a document that is no longer open, without saving it.
+    """
+
+    def __init__(self, doc, pdf_path, index_dir=INDEX_DIR):
+        self.doc = doc
+        self.pdf_path = pdf_path
+        self.index_dir = index_dir
+        self.file_hash = None
+        self.pages = [None] * doc.page_count
+        # Set once file_hash is known, which is well before the whole index is ready
+        self.hashed = threading.Event()
+        self.ready = threading.Event()
+        self.cancelled = threading.Event()
+        # Called from the indexing thread with (page_number, entry), in page order
+        self.listeners = []
+
+    @property
+    def index_path(self):
+        return os.path.join(self.index_dir, f"{self.file_hash}.json.gz")
+
+    def start(self):
+        threading.Thread(target=self._build, daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def page_text(self, page_number):
+        return self.page(page_number)["text"]
+
+    def page_words(self, page_number):
+        return self.page(page_number)["words"]
+
+    def page_blocks(self, page_number):
+        return self.page(page_number)["blocks"]
+
+    def page(self, page_number):
+        entry = self.pages[page_number]
+        if entry is None:
+            # Not indexed yet, extract this one page on demand
+            with fitz_lock:
+                entry = extract_page(self.doc.load_page(page_number))
+            self.pages[page_number] = entry
+        return entry
+
+    def _build(self):
+        try:
+            self.file_hash = file_hash(self.pdf_path)
+            self.hashed.set()
+            loaded = self._load()
+            for page_number in range(len(self.pages)):
+                if self.cancelled.is_set():
+                    return
+                entry = self.page(page_number)
+                for listener in self.listeners:
+                    listener(page_number, entry)
+            if not loaded:
+                self._save()
+        except Exception as e:
+            print("Indexing error:", e)
+        finally:
+            self.hashed.set()
+            self.ready.set()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with gzip.open(self.index_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or len(data["pages"]) != len(self.pages):
+            return False
+        self.pages = data["pages"]
+        return True
+
+    def _save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "pages": self.pages}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
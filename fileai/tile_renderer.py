@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+
+from fileai.render_cache import fitz_lock, image_nbytes, pixmap_to_image
+
+
+class TileRenderer:
+    """Rasterizes fixed-size tiles of a page through fitz clip rectangles.
+
+    Used at high zoom levels, where a full-page pixmap grows with zoom² while
+    only a viewport-sized part of it is ever on screen. Each page's content is
+    interpreted once into a display list that every tile is rasterized from, and
+    missing tiles are rendered on the render cache's worker, requested through
+    request and picked up with peek_tile. Tiles are kept in an LRU bounded by a
+    byte budget so scrolling back and forth stays cheap. Tiles that failed to
+    render are remembered in failed and not requested again.
+    """
+
+    def __init__(self, render_cache=None, tile_size=512, max_bytes=128 * 1024 * 1024, max_display_lists=2):
+        self.render_cache = render_cache
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        self.max_display_lists = max_display_lists
+        self.doc = None
+        self.bytes_used = 0
+        self._tiles = OrderedDict()
+        self._display_lists = OrderedDict()
+        self.failed = set()
+        self._lock = threading.Lock()
+
+    def set_document(self, doc):
+        with self._lock:
+            self.doc = doc
+            self._display_lists.clear()
+        self.clear()
+
+    def clear(self):
+        # Display lists don't depend on zoom and survive a clear
+        with self._lock:
+            self._tiles.clear()
+            self.failed = set()
+            self.bytes_used = 0
+
+    def visible_tiles(self, page_size, viewport):
+        page_width, page_height = page_size
+        x0, y0, x1, y1 = viewport
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(page_width, x1), min(page_height, y1)
+        if x1 <= x0 or y1 <= y0:
+            return []
+        ts = self.tile_size
+        return [
+            (col, row)
+            for row in range(int(y0 // ts), int((y1 - 1) // ts) + 1)
+            for col in range(int(x0 // ts), int((x1 - 1) // ts) + 1)
+        ]
+
+    def peek_tile(self, page_number, zoom, col, row):
+        key = (page_number, zoom, col, row)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def get_tile(self, page_number, zoom, col, row):
+        tile = self.peek_tile(page_number, zoom, col, row)
+        if tile is None:
+            tile = self._render_tile(self.doc, page_number, zoom, col, row)
+        return tile
+
+    def request(self, page_number, zoom, tiles):
+        """Renders tiles, (col, row) pairs in the given order, on the render cache's worker."""
+        doc = self.doc
+        self.render_cache.run_jobs([
+            lambda col=col, row=row: self._request_tile(doc, page_number, zoom, col, row)
+            for col, row in tiles if (page_number, zoom, col, row) not in self.failed
+        ])
+
+    def render_region(self, page_number, zoom, region):
+        # region is in zoomed pixel coordinates relative to the page's top-left corner
+        return self._render_region(self.doc, page_number, zoom, region)
+
+    def _request_tile(self, doc, page_number, zoom, col, row):
+        try:
+            self._render_tile(doc, page_number, zoom, col, row)
+        except Exception as e:
+            print("Tile render error:", e)
+            with self._lock:
+                if doc is self.doc:
+                    self.failed.add((page_number, zoom, col, row))
+
+    def _render_tile(self, doc, page_number, zoom, col, row):
+        key = (page_number, zoom, col, row)
+        with self._lock:
+            if key in self._tiles:
+                return self._tiles[key]
+        ts = self.tile_size
+        tile = self._render_region(doc, page_number, zoom, (col * ts, row * ts, (col + 1) * ts, (row + 1) * ts))
+        with self._lock:
+            if doc is not self.doc:
+                return tile
+            self._tiles[key] = tile
+            self.bytes_used += image_nbytes(tile)
+            while self.bytes_used > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.bytes_used -= image_nbytes(evicted)
+        return tile
+
+    def _render_region(self, doc, page_number, zoom, region):
+        x0, y0, x1, y1 = region
+        with fitz_lock:
+            display_list = self._display_list(doc, page_number)
+            page_rect = display_list.rect
+            origin = page_rect.tl
+            clip = fitz.Rect(x0 / zoom, y0 / zoom, x1 / zoom, y1 / zoom) + (origin.x, origin.y, origin.x, origin.y)
+            clip &= page_rect
+            pix = display_list.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+            return pixmap_to_image(pix)
+
+    def _display_list(self, doc, page_number):
+        # Called under fitz_lock. The page's content stream is interpreted once, not once per tile
+        with self._lock:
+            display_list = self._display_lists.get(page_number) if doc is self.doc else None
+            if display_list is not None:
+                self._display_lists.move_to_end(page_number)
+                return display_list
+        display_list = doc.load_page(page_number).get_displaylist()
+        with self._lock:
+            if doc is self.doc:
+                self._display_lists[page_number] = display_list
+                while len(self._display_lists) > self.max_display_lists:
+                    self._display_lists.popitem(last=False)
+        return display_list
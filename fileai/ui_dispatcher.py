@@ -0,0 +1,69 @@
+import queue
+import traceback
+import tkinter as tk
+
+
+class UIDispatcher:
+    """Applies widget updates posted from worker threads on the Tk thread, once per frame.
+
+    Workers post (key, callback) pairs to a thread-safe queue instead of calling
+    root.after for every chunk. Every frame the queue is drained and only the latest
+    callback per key is run, so a widget is updated at most once per frame however
+    fast the model streams.
+    """
+
+    def __init__(self, root, interval_ms=16):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.posted = 0
+        self.applied = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self._queue = queue.Queue()
+        self.root.after(self.interval_ms, self._drain)
+
+    def post(self, key, callback):
+        self.posted += 1
+        self._queue.put((key, callback))
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "posted": self.posted,
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+        }
+
+    def _drain(self):
+        try:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+            latest = {}
+            while True:
+                try:
+                    key, callback = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if key in latest:
+                    self.coalesced += 1
+                latest[key] = callback
+            for key, callback in latest.items():
+                try:
+                    callback()
+                except tk.TclError:
+                    # The target widget was destroyed while the update was queued
+                    pass
+                except Exception:
+                    # One failing update must not stop the ones after it
+                    self.failed += 1
+                    print(f"UI update {key!r} error:")
+                    traceback.print_exc()
+                self.applied += 1
+        finally:
+            self.root.after(self.interval_ms, self._drain)
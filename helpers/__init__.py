@@ -1,7 +1,11 @@
 from .icon_loader import load_icon
 from .get_youtube_videos import youtube_search
+from .response_cache import ResponseCache
+from .chat_memory import ChatMemory
 
 __all__ = [
     "load_icon",
-    "youtube_search"
+    "youtube_search",
+    "ResponseCache",
+    "ChatMemory"
 ]
\ No newline at end of file
@@ -0,0 +1,69 @@
+import threading
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for the models we use, good enough for budgeting
+    return len(text) // 4 + 1
+
+
+class ChatMemory:
+    """Conversation turns of the chat panel, packed into a bounded prompt context.
+
+    When the history no longer fits token_budget, the oldest turns (all but the last
+    keep_recent) are folded into a rolling summary through the summarize callable,
+    summarize(previous_summary, transcript) -> new summary. Whatever still does not
+    fit, or everything when no summarizer is given, is truncated oldest first.
+    """
+
+    def __init__(self, token_budget=2000, keep_recent=4, summarize=None):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summarize = summarize
+        self.summary = ""
+        self.turns = []
+        self._lock = threading.Lock()
+
+    def add(self, role, text):
+        with self._lock:
+            self.turns.append((role, text))
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self.turns = []
+
+    def context(self):
+        with self._lock:
+            self._compact()
+            return self._render(self.summary, self.turns)
+
+    def _compact(self):
+        if estimate_tokens(self._render(self.summary, self.turns)) <= self.token_budget:
+            return
+        if self.summarize is not None and len(self.turns) > self.keep_recent:
+            old_turns = self.turns[:-self.keep_recent] if self.keep_recent else self.turns
+            try:
+                self.summary = self.summarize(self.summary, self._render("", old_turns))
+                self.turns = self.turns[len(old_turns):]
+            except Exception as e:
+                print("Chat summarization error:", e)
+        # Summary gets at most a quarter of the budget, recent turns keep the rest
+        max_summary_chars = self.token_budget
+        if len(self.summary) > max_summary_chars:
+            self.summary = self.summary[-max_summary_chars:]
+        while self.turns and estimate_tokens(self._render(self.summary, self.turns)) > self.token_budget:
+            role, text = self.turns[0]
+            excess_chars = (estimate_tokens(self._render(self.summary, self.turns)) - self.token_budget) * 4
+            if len(self.turns) > 1 or excess_chars >= len(text):
+                self.turns.pop(0)
+            else:
+                self.turns[0] = (role, text[excess_chars:])
+
+    @staticmethod
+    def _render(summary, turns):
+        lines = []
+        if summary:
+            lines.append(f"Summary of the earlier conversation: {summary}")
+        for role, text in turns:
+            lines.append(f"{'User' if role == 'user' else 'Assistant'}: {text}")
+        return "\n".join(lines)
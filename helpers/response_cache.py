@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+RESPONSE_CACHE_DIR = os.path.join("cache", "responses")
+
+
+def image_digest(image):
+    """Hash of the image sent with a prompt: a file path, a PIL image or None."""
+    if image is None:
+        return ""
+    if isinstance(image, str):
+        if not os.path.isfile(image):
+            return ""
+        with open(image, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    digest = hashlib.sha256(f"{image.mode}{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of model answers.
+
+    Entries are keyed by model, temperature, prompt text and image hash, one file
+    per answer. When the directory grows past max_bytes the least recently used
+    entries (by file mtime, refreshed on every hit) are removed.
+    """
+
+    def __init__(self, cache_dir=RESPONSE_CACHE_DIR, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def make_key(self, model, temperature, prompt, image=None):
+        payload = json.dumps([model, temperature, prompt, image_digest(image)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)
+            return text
+        except OSError:
+            return None
+
+    def put(self, key, text):
+        if not text:
+            return
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".txt"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def replay(self, text, chunk_size=24, delay=0.01):
+        """Yields a cached answer in small chunks so consumers see it stream in."""
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size]
+            time.sleep(delay)
@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, PhotoImage
 import fitz  # PyMuPDF
 from PIL import Image, ImageTk
-import io
 from gtts import gTTS
 import os
 import pygame
@@ -21,6 +20,7 @@ from tkhtmlview import HTMLScrolledText, HTMLLabel
 
 from call_ai import ask_ai, explain_ai, translate_ai, chat_ai, notes_ai, search_ai
 from helpers import load_icon
+from fileai.render_cache import pixmap_to_image
 
 pygame.mixer.init()
 
@@ -532,8 +532,7 @@ class PDFViewer:
         page = self.doc.load_page(page_number)
         mat = fitz.Matrix(self.zoom, self.zoom)
         pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("png")
-        pil_img = Image.open(io.BytesIO(img_data))
+        pil_img = pixmap_to_image(pix)
         self.current_pil_image = pil_img
         self.page_image_tk = ImageTk.PhotoImage(pil_img)
         self.page_text = page.get_text("text")
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+from typing import Any, List
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from customAgents.agent_llm import BaseLLM, BaseMultiModal  # noqa: E402
+
+
+class CountingChatModel(BaseChatModel):
+    """Chat model streaming fixed chunks, counting how many the caller actually pulled."""
+
+    chunks: List[str]
+    delay: float = 0.0
+    pulled: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self.chunks)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        for text in self.chunks:
+            if self.delay:
+                time.sleep(self.delay)
+            self.pulled += 1
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, model):
+        self._fake = model
+        super().__init__(api_key="", model="fake", temperature=0)
+
+    def _initialize_llm(self):
+        return self._fake
+
+
+class FakeMultiModal(BaseMultiModal):
+    def __init__(self, model):
+        self._fake = model
+        super().__init__(api_key="", model="fake")
+
+    def _initialize_multimodal(self):
+        return self._fake
+
+
+@pytest.fixture
+def make_model():
+    def make(n_chunks=10, delay=0.0):
+        return CountingChatModel(chunks=[f"c{i} " for i in range(n_chunks)], delay=delay)
+    return make
+
+
+@pytest.fixture
+def fake_llm():
+    return FakeLLM
+
+
+@pytest.fixture
+def fake_multimodal():
+    return FakeMultiModal
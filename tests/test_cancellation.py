@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+from customAgents.agent_llm.cancellation import CancellationToken, until_cancelled
+from customAgents.agent_prompt import SimplePrompt
+from customAgents.runtime import SimpleRuntime
+from helpers import ResponseCache
+
+from conftest import ROOT
+
+CANCEL_AT = 3
+
+
+def consume_until_cancel(chunks, token):
+    received = []
+    for chunk in chunks:
+        received.append(chunk)
+        if len(received) == CANCEL_AT:
+            token.cancel()
+    return received
+
+
+async def aconsume_until_cancel(chunks, token):
+    received = []
+    async for chunk in chunks:
+        received.append(chunk)
+        if len(received) == CANCEL_AT:
+            token.cancel()
+    return received
+
+
+def test_until_cancelled_stops_pulling_and_closes():
+    pulled, closed = [], []
+
+    def source():
+        try:
+            for i in range(10):
+                pulled.append(i)
+                yield i
+        finally:
+            closed.append(True)
+
+    token = CancellationToken()
+    assert consume_until_cancel(until_cancelled(source(), token), token) == [0, 1, 2]
+    assert len(pulled) == CANCEL_AT
+    assert closed == [True]
+
+
+def test_until_cancelled_without_token_yields_everything():
+    assert list(until_cancelled(iter(range(5)), None)) == [0, 1, 2, 3, 4]
+
+
+def test_stream_response_stops_pulling_after_cancel(make_model, fake_llm):
+    model = make_model()
+    token = CancellationToken()
+    received = consume_until_cancel(fake_llm(model).stream_response("hi", cancel_token=token), token)
+    assert len(received) == CANCEL_AT
+    assert model.pulled == CANCEL_AT
+
+
+def test_stream_response_already_cancelled_pulls_nothing(make_model, fake_llm):
+    model = make_model()
+    token = CancellationToken()
+    token.cancel()
+    assert list(fake_llm(model).stream_response("hi", cancel_token=token)) == []
+    assert model.pulled == 0
+
+
+def test_multimodal_stream_stops_pulling_after_cancel(make_model, fake_multimodal):
+    model = make_model()
+    token = CancellationToken()
+    received = consume_until_cancel(fake_multimodal(model).multimodal_stream("hi", cancel_token=token), token)
+    assert len(received) == CANCEL_AT
+    assert model.pulled == CANCEL_AT
+
+
+def test_llm_astream_stops_pulling_after_cancel(make_model, fake_llm):
+    model = make_model()
+    token = CancellationToken()
+    received = asyncio.run(aconsume_until_cancel(fake_llm(model).astream("hi", cancel_token=token), token))
+    assert len(received) == CANCEL_AT
+    assert model.pulled == CANCEL_AT
+
+
+def test_multimodal_astream_stops_pulling_after_cancel(make_model, fake_multimodal):
+    model = make_model()
+    token = CancellationToken()
+    received = asyncio.run(aconsume_until_cancel(fake_multimodal(model).astream("hi", cancel_token=token), token))
+    assert len(received) == CANCEL_AT
+    assert model.pulled == CANCEL_AT
+
+
+def test_runtime_stream_drops_cancelled_response(make_model, fake_llm):
+    prompt = SimplePrompt(text="question")
+    prompt.construct_prompt()
+    runtime = SimpleRuntime(llm=fake_llm(make_model()), prompt=prompt)
+    before = prompt.prompt
+    token = CancellationToken()
+    consume_until_cancel(runtime.stream(cancel_token=token), token)
+    assert prompt.prompt == before
+
+
+def test_cached_stream_does_not_store_cancelled_answer(tmp_path, monkeypatch, make_model, fake_llm):
+    monkeypatch.chdir(ROOT)
+    import call_ai
+
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    monkeypatch.setattr(call_ai, "response_cache", cache)
+    llm = fake_llm(make_model())
+    key = cache.make_key(call_ai.config["model"], 0.5, "prompt", None)
+
+    token = CancellationToken()
+    consume_until_cancel(call_ai.cached_stream("prompt", None, 0.5, lambda cancel_token: llm.stream_response("hi", cancel_token), token), token)
+    assert cache.get(key) is None
+    assert os.listdir(tmp_path) == []
+
+    answer = "".join(call_ai.cached_stream("prompt", None, 0.5, lambda cancel_token: llm.stream_response("hi", cancel_token)))
+    assert cache.get(key) == answer
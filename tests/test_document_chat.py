@@ -0,0 +1,94 @@
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def call_ai(monkeypatch, tmp_path, make_model, fake_llm):
+    monkeypatch.chdir(ROOT)
+    import call_ai
+    from RAG import SemanticCache
+
+    models = []
+
+    def get(cls, **kwargs):
+        models.append(make_model(5))
+        return fake_llm(models[-1])
+
+    monkeypatch.setattr(call_ai.llm_pool, "get", get)
+    monkeypatch.setattr(call_ai, "semantic_cache", SemanticCache(path=None))
+    call_ai.models = models
+    return call_ai
+
+
+@pytest.fixture
+def document_rag(tmp_path):
+    from RAG import DocumentRAG, HashingEmbeddings
+    from RAG.evaluate import make_fixture_pdf
+
+    pdf_path = str(tmp_path / "fixture.pdf")
+    make_fixture_pdf(pdf_path, pages=3)
+    rag = DocumentRAG(pdf_path, embedding_model=HashingEmbeddings(), rag_dir=str(tmp_path / "rag"))
+    rag._build()
+    assert rag.ready.is_set()
+    return rag
+
+
+def test_repeated_question_is_served_from_semantic_cache(call_ai, document_rag):
+    question = "what does the watchdog do"
+    first = "".join(call_ai.document_chat_ai(question, "", document_rag))
+    second = "".join(call_ai.document_chat_ai(question, "", document_rag))
+    assert second == first
+    assert len(call_ai.models) == 1
+    assert call_ai.semantic_cache.hits == 1
+
+
+def test_short_follow_up_is_not_cached(call_ai, document_rag):
+    "".join(call_ai.document_chat_ai("why?", "", document_rag))
+    "".join(call_ai.document_chat_ai("why?", "", document_rag))
+    assert len(call_ai.models) == 2
+
+
+def test_failed_index_falls_back_to_plain_chat(call_ai, tmp_path):
+    from RAG import DocumentRAG
+
+    rag = DocumentRAG(str(tmp_path / "missing.pdf"), embedding_model=object(), rag_dir=str(tmp_path / "rag"))
+    rag._build()
+    answer = "".join(call_ai.document_chat_ai("what is this about", "", rag))
+    assert rag.error is not None
+    assert answer.startswith("(The document index could not be built")
+    assert "still being built" not in answer
+
+
+def test_question_with_history_is_not_served_from_cache(call_ai, document_rag):
+    question = "can you explain that in more detail"
+    "".join(call_ai.document_chat_ai(question, "user: what does the watchdog do", document_rag))
+    "".join(call_ai.document_chat_ai(question, "user: how is the fixture built", document_rag))
+    assert len(call_ai.models) == 2
+    assert call_ai.semantic_cache.hits == 0
+
+
+def test_index_notices_are_marked_apart_from_the_answer(call_ai, tmp_path):
+    from RAG import DocumentRAG
+
+    rag = DocumentRAG(str(tmp_path / "missing.pdf"), embedding_model=object(), rag_dir=str(tmp_path / "rag"))
+    rag._build()
+    chunks = list(call_ai.document_chat_ai("what is this about", "", rag))
+    assert isinstance(chunks[0], call_ai.Notice)
+    answer = "".join(chunk for chunk in chunks if not isinstance(chunk, call_ai.Notice))
+    assert answer == "".join(call_ai.models[-1].chunks)
+
+
+def test_cancelled_build_never_becomes_ready(tmp_path):
+    from RAG import DocumentRAG, HashingEmbeddings
+    from RAG.create_db import load_manifest
+    from RAG.evaluate import make_fixture_pdf
+
+    pdf_path = str(tmp_path / "fixture.pdf")
+    make_fixture_pdf(pdf_path, pages=3)
+    rag = DocumentRAG(pdf_path, embedding_model=HashingEmbeddings(), rag_dir=str(tmp_path / "rag"))
+    rag.cancel()
+    rag._build()
+    assert not rag.ready.is_set()
+    assert rag.error is None
+    assert load_manifest(rag.chroma_path) == {}
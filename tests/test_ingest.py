@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from RAG.ingest import EmbeddingPipeline
+
+
+class FlakyEmbeddings:
+    """Fails the first failures calls, records how many calls were in flight at once."""
+
+    def __init__(self, failures, delay=0.01):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if call <= self.failures:
+                raise RuntimeError("rate limited")
+            return [[float(len(text))] for text in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def chunks(n):
+    return ((f"chunk-{i}", f"text {i}", {"i": i}) for i in range(n))
+
+
+def run_pipeline(embeddings, n_chunks, **kwargs):
+    written = []
+
+    def write(ids, vectors, documents, metadatas):
+        assert len(ids) == len(vectors) == len(documents) == len(metadatas)
+        written.extend(ids)
+
+    pipeline = EmbeddingPipeline(embeddings, batch_size=4, max_concurrency=3, base_delay=0, write_batch_size=10, **kwargs)
+    return pipeline, pipeline.run(chunks(n_chunks), write), written
+
+
+def test_retries_and_writes_every_chunk_once():
+    embeddings = FlakyEmbeddings(failures=5)
+    pipeline, stats, written = run_pipeline(embeddings, 50)
+    assert sorted(written) == sorted(f"chunk-{i}" for i in range(50))
+    assert stats["chunks"] == 50
+    assert stats["retries"] == pipeline.retries == 5
+    # 13 batches, each failed call was retried once more
+    assert embeddings.calls == 13 + 5
+
+
+def test_concurrency_is_bounded():
+    embeddings = FlakyEmbeddings(failures=0, delay=0.02)
+    _, _, written = run_pipeline(embeddings, 100)
+    assert len(written) == 100
+    assert embeddings.peak == 3
+
+
+def test_batch_failing_past_max_retries_raises():
+    embeddings = FlakyEmbeddings(failures=100)
+    with pytest.raises(RuntimeError):
+        run_pipeline(embeddings, 4, max_retries=2)
+    assert embeddings.calls == 3
+
+
+def test_retries_are_counted_per_run():
+    embeddings = FlakyEmbeddings(failures=2)
+    pipeline = EmbeddingPipeline(embeddings, batch_size=4, max_concurrency=2, base_delay=0)
+    assert pipeline.run(chunks(8), lambda *columns: None)["retries"] == 2
+    assert pipeline.run(chunks(8), lambda *columns: None)["retries"] == 0
+    assert pipeline.retries == 0
@@ -0,0 +1,45 @@
+import time
+
+from customAgents.agent_prompt import SimplePrompt
+from customAgents.runtime import SimpleRuntime
+
+N_CHUNKS = 10
+DELAY = 0.05
+
+
+def first_chunk_and_total(chunks):
+    start = time.perf_counter()
+    first = None
+    received = []
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        received.append(chunk)
+    return first, time.perf_counter() - start, received
+
+
+def assert_streams_incrementally(first, total, received):
+    assert len(received) == N_CHUNKS
+    # The first chunk waits for one model step, the whole stream for all of them
+    assert first < DELAY * 3
+    assert total >= DELAY * N_CHUNKS
+    assert first < total / 3
+
+
+def test_llm_stream_first_chunk_latency(make_model, fake_llm):
+    llm = fake_llm(make_model(N_CHUNKS, DELAY))
+    assert_streams_incrementally(*first_chunk_and_total(llm.llm_stream("hi")))
+
+
+def test_multimodal_stream_first_chunk_latency(make_model, fake_multimodal):
+    multimodal = fake_multimodal(make_model(N_CHUNKS, DELAY))
+    assert_streams_incrementally(*first_chunk_and_total(multimodal.multimodal_stream("hi")))
+
+
+def test_runtime_stream_first_chunk_latency(make_model, fake_llm):
+    prompt = SimplePrompt(text="question")
+    prompt.construct_prompt()
+    runtime = SimpleRuntime(llm=fake_llm(make_model(N_CHUNKS, DELAY)), prompt=prompt)
+    first, total, received = first_chunk_and_total(runtime.stream())
+    assert_streams_incrementally(first, total, received)
+    assert prompt.prompt.endswith("".join(received))